@@ -1,85 +1,1193 @@
 import argparse
+import asyncio
+import atexit
+import bisect
+import gzip
+import html
 import logging
 import mimetypes
+import multiprocessing
 import os
+import select
+import selectors
+import signal
 import socket
+import ssl
+import stat as stat_module
+import struct
+import threading
+import time
 import urllib
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
+import uuid
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from email.utils import formatdate, parsedate_to_datetime
 from enum import Enum
+from functools import lru_cache
+from typing import Callable, Dict, NamedTuple, Optional
 
 DOCUMENT_ROOT = "./"
 TIME_OUT_SERVER = 10
+HEADER_TIMEOUT = 10
+KEEP_ALIVE_TIMEOUT = 5
+# a busy keep-alive client is served by the same worker, an idle one is parked on the selector after this wait
+KEEP_ALIVE_INLINE_WAIT = 0.02
+KEEP_ALIVE_INLINE_SLICE = 0.005
+WRITE_TIMEOUT = 60
+DEADLINE_CHECK_INTERVAL = 0.5
 VALID_METHODS = ["GET", "HEAD"]
+BACKENDS = ["threads", "asyncio"]
+OVERLOAD_POLICIES = ["reject", "pause"]
+DEFAULT_BACKLOG = 128
+DEFAULT_MAX_PENDING = 64
+OVERLOAD_LOG_INTERVAL = 1
+ACCEPT_POLL_INTERVAL = 0.5
+DEFAULT_SHUTDOWN_TIMEOUT = 30
+SHUTDOWN_IDLE_GRACE = 1
+SHUTDOWN_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+HANDOFF_TIMEOUT = 10
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+STATUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+READ_SIZE = 4096
+MAX_RANGES = 16
+MAX_HEADER_SIZE = 8192
+MAX_HEADERS = 100
+LINGER_TIMEOUT = 1
+LINGER_MAX_SIZE = 64 * 1024
+USED_HEADERS = frozenset({
+    b"host", b"connection", b"range", b"if-range", b"if-none-match", b"if-modified-since", b"accept-encoding",
+    # access log only
+    b"referer", b"user-agent", b"x-real-ip", b"x-forwarded-for", b"x-request-id", b"x-rb-user",
+})
+ACCESS_LOG_QUEUE_SIZE = 65536
+ACCESS_LOG_FLUSH_INTERVAL = 0.5
+# like nginx: quotes, backslashes and control characters from the client are written as \xXX
+ACCESS_LOG_ESCAPES = {code: f"\\x{code:02X}" for code in [*range(0x20), 0x22, 0x5C, 0x7F]}
+
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/plain", "text/xml", "text/javascript",
+    "application/javascript", "application/json", "application/xml", "image/svg+xml",
+}
+PRECOMPRESSED_SUFFIXES = [("br", ".br"), ("gzip", ".gz")]
+GZIP_MIN_SIZE = 256
+GZIP_MAX_SIZE = 1024 * 1024
+GZIP_LEVEL = 6
+GZIP_CACHE_SIZE = 128
+# per process, every asyncio worker has its own cache
+GZIP_CACHE_MAX_BYTES = 16 * 1024 * 1024
+PATH_CACHE_SIZE = 4096
+PATH_CACHE_TTL = 1
+INDEX_FILE = "index.html"
+AUTOINDEX_CACHE_SIZE = 256
+AUTOINDEX_CONTENT_TYPE = "text/html; charset=utf-8"
+IOV_MAX = 1024
+# SO_LINGER with a zero timeout: close() resets the connection and drops unsent data
+ABORT_LINGER = struct.pack("ii", 1, 0)
+TLS_SEND_SIZE = 64 * 1024
+TLS_SESSION_TICKETS = 2
+
+ACCEPT_RANGES_HEADER = b"Accept-Ranges: bytes\r\n"
+VARY_HEADER = b"Vary: Accept-Encoding\r\n"
+CONNECTION_HEADERS = {
+    True: b"Connection: keep-alive\r\n",
+    False: b"Connection: close\r\n",
+}
 
 
 class HTTPStatus(Enum):
     OK = 200
+    PARTIAL_CONTENT = 206
+    NOT_MODIFIED = 304
+    BAD_REQUEST = 400
     FORBIDDEN = 403
     NOT_FOUND = 404
     METHOD_NOT_ALLOWED = 405
+    RANGE_NOT_SATISFIABLE = 416
+    REQUEST_HEADER_FIELDS_TOO_LARGE = 431
     INTERNAL_SERVER_ERROR = 500
+    SERVICE_UNAVAILABLE = 503
+
+
+class LRUCache:
+    """LRU cache bounded by entry count and, with max_bytes, by the total len() of its values"""
+
+    def __init__(self, max_size, ttl=None, max_bytes=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, value) -> int:
+        return len(value) if self.max_bytes is not None else 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._items[key]
+                self.size_bytes -= self._size(value)
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        size = self._size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= self._size(previous[1])
+            self._items[key] = (expires_at, value)
+            self.size_bytes += size
+            while len(self._items) > self.max_size or self.max_bytes is not None and self.size_bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.size_bytes -= self._size(evicted)
+
+
+class DateHeader:
+    """Encoded Date header line, refreshed once per second by a background thread"""
+
+    def __init__(self):
+        self.value = self.format()
+        self._lock = threading.Lock()
+        self._owner_pid = None
+
+    @staticmethod
+    def format() -> bytes:
+        return f"Date: {formatdate(usegmt=True)}\r\n".encode()
+
+    def start(self):
+        with self._lock:
+            # a forked worker process doesn't inherit the parent's refresh thread
+            if self._owner_pid == os.getpid():
+                return
+            self._owner_pid = os.getpid()
+            self.value = self.format()
+            threading.Thread(target=self._refresh_forever, name="DateHeader", daemon=True).start()
+
+    def _refresh_forever(self):
+        while True:
+            time.sleep(1 - time.time() % 1)
+            self.value = self.format()
+
+
+class MetricsShard:
+    """Counters and histograms written by a single thread only"""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.histograms = {}
+
+
+class Metrics:
+    """
+    Server statistics in Prometheus text format.
+    Every thread records into its own shard, shards are summed up only when the status page is rendered.
+    """
+
+    def __init__(self):
+        self.definitions = {}
+        self.collectors = {}
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def define(self, name: str, metric_type: str, description: str, label: str = None):
+        self.definitions[name] = (metric_type, description, label)
+
+    def register_collector(self, name: str, metric_type: str, description: str, collect: Callable,
+                           label: str = None):
+        """Adds a metric computed on render: `collect` returns a number or {label value: number}"""
+        self.define(name, metric_type, description, label)
+        self.collectors[name] = collect
+
+    def _shard(self) -> MetricsShard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = MetricsShard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, label=None, value=1):
+        self._shard().counters[(name, label)] += value
+
+    def observe(self, name: str, seconds: float):
+        histograms = self._shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            # bucket counts, then +Inf, then the sum of observed values
+            histogram = histograms[name] = [0] * (len(LATENCY_BUCKETS) + 2)
+        histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+
+    def total(self, name: str) -> float:
+        return sum(value for shard in list(self._shards)
+                   for (counter_name, _), value in list(shard.counters.items()) if counter_name == name)
+
+    def collect(self):
+        counters, histograms = Counter(), {}
+        for shard in list(self._shards):
+            counters.update(dict(list(shard.counters.items())))
+            for name, histogram in list(shard.histograms.items()):
+                merged = histograms.setdefault(name, [0] * len(histogram))
+                for index, value in enumerate(list(histogram)):
+                    merged[index] += value
+        return counters, histograms
+
+    def render(self) -> str:
+        counters, histograms = self.collect()
+        lines = []
+        for name, (metric_type, description, label) in self.definitions.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if name in self.collectors:
+                values = self.collectors[name]()
+                if not isinstance(values, dict):
+                    values = {None: values}
+            elif metric_type == "histogram":
+                lines.extend(self.render_histogram(name, histograms.get(name)))
+                continue
+            else:
+                values = {counter_label: value for (counter_name, counter_label), value in counters.items()
+                          if counter_name == name}
+                values = values or ({} if label else {None: 0})
+
+            for label_value, value in sorted(values.items(), key=lambda item: str(item[0])):
+                labels = f'{{{label}="{label_value}"}}' if label else ""
+                lines.append(f"{name}{labels} {self.format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def format_value(value) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+    @staticmethod
+    def render_histogram(name: str, histogram):
+        histogram = histogram or [0] * (len(LATENCY_BUCKETS) + 2)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ["+Inf"], histogram):
+            cumulative += count
+            yield f'{name}_bucket{{le="{bound}"}} {cumulative}'
+        yield f"{name}_sum {Metrics.format_value(histogram[-1])}"
+        yield f"{name}_count {cumulative}"
+
+
+@lru_cache(maxsize=None)
+def status_header(http_status: HTTPStatus, server_name: str) -> bytes:
+    return f"HTTP/1.1 {http_status.value} {http_status.name}\r\nServer: {server_name}\r\n".encode()
+
+
+@lru_cache(maxsize=256)
+def content_type_header(content_type: str) -> bytes:
+    return f"Content-Type: {content_type}\r\n".encode()
+
+
+def create_ssl_context(certfile: str, keyfile: str = None) -> ssl.SSLContext:
+    """Server TLS context; created before worker processes fork, so they share session ticket keys"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certfile, keyfile)
+    # resumption: stateless tickets for TLS 1.3 and 1.2, plus the server session cache for 1.2 session ids
+    context.options &= ~ssl.OP_NO_TICKET
+    context.num_tickets = TLS_SESSION_TICKETS
+    return context
+
+
+def count_tls_handshake(ssl_object):
+    metrics.inc("httpd_tls_handshakes_total", "resumed" if ssl_object.session_reused else "full")
+
+
+def send_buffers(conn, buffers):
+    """Writes buffers with scatter-gather sendmsg calls, resuming after partial writes"""
+    buffers = list(buffers)
+    while buffers:
+        sent = conn.sendmsg(buffers[:IOV_MAX])
+        while sent:
+            size = len(buffers[0])
+            if sent >= size:
+                sent -= size
+                del buffers[0]
+            else:
+                buffers[0] = memoryview(buffers[0])[sent:]
+                sent = 0
+
+
+class PathInfo(NamedTuple):
+    path: str
+    kind: Optional[str]
+    stat: Optional[os.stat_result]
+
+
+date_header = DateHeader()
+compressed_cache = LRUCache(GZIP_CACHE_SIZE, max_bytes=GZIP_CACHE_MAX_BYTES)
+path_cache = LRUCache(PATH_CACHE_SIZE, ttl=PATH_CACHE_TTL)
+autoindex_cache = LRUCache(AUTOINDEX_CACHE_SIZE)
+caches = {"path": path_cache, "compressed": compressed_cache, "autoindex": autoindex_cache}
+
+metrics = Metrics()
+metrics.define("httpd_requests_total", "counter", "Responses sent, by status code", label="status")
+metrics.define("httpd_bytes_sent_total", "counter", "Response bytes sent, headers included")
+metrics.define("httpd_access_log_dropped_total", "counter", "Access log records dropped on a full queue")
+metrics.define("httpd_connections_opened_total", "counter", "Client connections handled")
+metrics.define("httpd_connections_closed_total", "counter", "Client connections closed")
+metrics.define("httpd_deadline_closed_total", "counter", "Connections closed because a phase deadline passed",
+               label="phase")
+metrics.define("httpd_per_ip_rejected_total", "counter", "Connections rejected over the per-IP connection cap")
+metrics.define("httpd_tls_handshakes_total", "counter", "Completed TLS handshakes, full or resumed", label="type")
+metrics.define("httpd_tls_handshake_errors_total", "counter", "TLS handshakes that failed or timed out")
+metrics.register_collector(
+    "httpd_connections_in_flight", "gauge", "Client connections being handled",
+    lambda: metrics.total("httpd_connections_opened_total") - metrics.total("httpd_connections_closed_total"))
+metrics.define("httpd_time_to_first_byte_seconds", "histogram",
+               "Time from accept (or the first byte of a keep-alive request) to the first response byte")
+metrics.define("httpd_request_duration_seconds", "histogram",
+               "Time from accept (or the first byte of a keep-alive request) to the last response byte")
+metrics.register_collector("httpd_cache_hits_total", "counter", "Cache lookups served from the cache",
+                           lambda: {name: cache.hits for name, cache in caches.items()}, label="cache")
+metrics.register_collector("httpd_cache_misses_total", "counter", "Cache lookups that missed",
+                           lambda: {name: cache.misses for name, cache in caches.items()}, label="cache")
+metrics.register_collector(
+    "httpd_cache_hit_ratio", "gauge", "Share of cache lookups served from the cache",
+    lambda: {name: cache.hits / ((cache.hits + cache.misses) or 1) for name, cache in caches.items()},
+    label="cache")
+
+
+class PendingHandshake:
+    """Stands in for a connection handler in the deadline reaper while a worker thread runs the TLS handshake"""
+    idle = False
+    phase = "header"
+
+    def __init__(self, conn, deadline: float):
+        self.conn = conn
+        self.deadline = deadline
+
+    def close_connection(self, abort=False):
+        # wakes up the handshake blocked in recv, it then fails with an SSL error; the plain socket shutdown
+        # leaves the SSL object alone, SSLSocket.shutdown would drop it under the running handshake
+        try:
+            if abort:
+                self.conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, ABORT_LINGER)
+            socket.socket.shutdown(self.conn, socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus):
+        super().__init__(status.name)
+        self.status = status
+
+
+class Request(NamedTuple):
+    method: str
+    uri: str
+    http_ver: str
+    headers: Dict[str, str]
+    target: str
+
+
+class RequestParser:
+    """
+    Incremental request head parser over a fixed reusable buffer.
+    Bytes after the header terminator are kept for the next (pipelined) request.
+    """
+
+    def __init__(self, max_size=MAX_HEADER_SIZE, max_headers=MAX_HEADERS):
+        self.max_headers = max_headers
+        self._buffer = bytearray(max_size)
+        self._view = memoryview(self._buffer)
+        self._length = 0
+        self._scanned = 0
+
+    @property
+    def pending(self) -> bool:
+        return self._length > 0
+
+    @property
+    def free_space(self) -> int:
+        return len(self._buffer) - self._length
+
+    def recv_into(self, conn) -> int:
+        space = self._view[self._length:]
+        if not space:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        nbytes = conn.recv_into(space)
+        self._length += nbytes
+        return nbytes
+
+    def feed(self, data: bytes):
+        end = self._length + len(data)
+        if end > len(self._buffer):
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        self._buffer[self._length:end] = data
+        self._length = end
+
+    def next_request(self) -> Optional[Request]:
+        # resume the search where the previous one stopped, minus a partial terminator
+        end = self._buffer.find(b"\r\n\r\n", max(self._scanned - 3, 0), self._length)
+        if end < 0:
+            self._scanned = self._length
+            if self._length == len(self._buffer):
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            return None
+
+        request = self.parse_head(bytes(self._view[:end]))
+        consumed = end + 4
+        rest = self._length - consumed
+        self._buffer[:rest] = self._view[consumed:self._length]
+        self._length = rest
+        self._scanned = 0
+        return request
+
+    def parse_head(self, head: bytes) -> Request:
+        lines = head.split(b"\r\n")
+        if len(lines) - 1 > self.max_headers:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+        request_line = lines[0].split(b" ")
+        if len(request_line) != 3:
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+        method, url, http_ver = request_line
+        if not method.isalpha() or not url or not http_ver.startswith(b"HTTP/"):
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(b":")
+            if not sep or not name or name != name.strip():
+                raise HTTPError(HTTPStatus.BAD_REQUEST)
+            name = name.lower()
+            if name not in USED_HEADERS:
+                continue
+            name, value = name.decode("ascii"), value.strip().decode("latin-1")
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        target = url.decode(errors="replace")
+        return Request(method=method.decode("ascii"),
+                       uri=self.parse_uri(target),
+                       http_ver=http_ver.decode("ascii", errors="replace"),
+                       headers=headers,
+                       target=target)
+
+    @staticmethod
+    def parse_uri(url: str) -> str:
+        url = urllib.parse.unquote(url, encoding='utf-8', errors='replace')
+        return urllib.parse.urlparse(url).path
+
+
+class AccessLog:
+    """
+    Access log in the nginx ui_short format, the one log_analyzer parses.
+    Request threads only append a record to a bounded queue (dropping it when the queue is full),
+    a background thread formats the queued records and appends them to the file in batches.
+    """
+
+    def __init__(self, path, max_queue=ACCESS_LOG_QUEUE_SIZE, flush_interval=ACCESS_LOG_FLUSH_INTERVAL):
+        self.path = path
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self._records = deque()
+        self._fd = None
+        self._owner_pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._owner_pid == os.getpid():
+                return
+            self._owner_pid = os.getpid()
+            self._records.clear()
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            threading.Thread(target=self._flush_forever, name="AccessLog", daemon=True).start()
+            atexit.register(self.flush)
+
+    def log(self, record: tuple):
+        # len + append on a deque don't block, an overflowing record is dropped instead of waiting
+        if len(self._records) >= self.max_queue:
+            metrics.inc("httpd_access_log_dropped_total")
+            return
+        self._records.append(record)
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as error:
+                logging.error(f"Access log write failed: {error}")
+
+    def flush(self):
+        lines = []
+        while self._records:
+            lines.append(self.format(*self._records.popleft()))
+        if not lines:
+            return
+        # one O_APPEND write per batch keeps lines of several worker processes from interleaving
+        data = memoryview("".join(lines).encode())
+        while data:
+            data = data[os.write(self._fd, data):]
+
+    @staticmethod
+    def format(remote_addr, logged_at, request_line, status, body_bytes_sent, headers, request_time) -> str:
+        time_local = time.strftime("%d/%b/%Y:%H:%M:%S %z", time.localtime(logged_at))
+        request_line = request_line.translate(ACCESS_LOG_ESCAPES)
+        headers = {name: value.translate(ACCESS_LOG_ESCAPES) for name, value in headers.items()}
+        return (f'{remote_addr} -  {headers.get("x-real-ip", "-")} [{time_local}] "{request_line}" '
+                f'{status} {body_bytes_sent} "{headers.get("referer", "-")}" '
+                f'"{headers.get("user-agent", "-")}" "{headers.get("x-forwarded-for", "-")}" '
+                f'"{headers.get("x-request-id", "-")}" "{headers.get("x-rb-user", "-")}" '
+                f'{request_time:.3f}\n')
+
+
+class IdleConnections:
+    """
+    Keep-alive connections of the thread pool waiting for their next request. A single selector thread watches
+    them, so an idle client holds neither a worker thread nor an admission slot until it sends again.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="IdleConnections", daemon=True)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.selector.get_map())
+
+    def start(self):
+        self.thread.start()
+
+    def park(self, handler) -> bool:
+        if handler.deadline is None:
+            handler.deadline = time.monotonic() + TIME_OUT_SERVER
+        with self.lock:
+            if self.closed:
+                return False
+            try:
+                self.selector.register(handler.conn, selectors.EVENT_READ, handler)
+            except (ValueError, OSError):
+                return False
+        return True
+
+    def run(self):
+        while not self.closed:
+            events = self.selector.select(DEADLINE_CHECK_INTERVAL)
+            now = time.monotonic()
+            closing = self.server.closing_idle.is_set()
+            with self.lock:
+                ready = [key.data for key, _ in events]
+                expired = [key.data for key in self.selector.get_map().values()
+                           if key.data not in ready and (closing or key.data.deadline <= now)]
+                for handler in ready + expired:
+                    self.selector.unregister(handler.conn)
+            for handler in expired:
+                if not closing:
+                    metrics.inc("httpd_deadline_closed_total", "idle")
+                handler.close()
+            for handler in ready:
+                self.server.resume_connection(handler)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        self.thread.join()
+        with self.lock:
+            handlers = [key.data for key in self.selector.get_map().values()]
+            for handler in handlers:
+                self.selector.unregister(handler.conn)
+        for handler in handlers:
+            handler.close()
+        self.selector.close()
 
 
 class Server:
-    def __init__(self, host, port, server_name, max_workers, document_root):
+    def __init__(self, host, port, server_name, max_workers, document_root, backend="threads",
+                 backlog=DEFAULT_BACKLOG, max_pending=DEFAULT_MAX_PENDING, overload="reject",
+                 status_path=None, status_port=None, access_log=None, autoindex=False,
+                 shutdown_timeout=DEFAULT_SHUTDOWN_TIMEOUT, handoff_socket=None, certfile=None, keyfile=None,
+                 header_timeout=HEADER_TIMEOUT, keep_alive_timeout=KEEP_ALIVE_TIMEOUT, write_timeout=WRITE_TIMEOUT,
+                 max_connections_per_ip=0):
         self.host = host
         self.port = port
         self.server_name = server_name
         self.max_workers = max_workers
         self.document_root = document_root
+        self.backend = backend
+        self.backlog = backlog
+        self.max_pending = max_pending
+        self.overload = overload
+        self.status_path = status_path
+        self.status_port = status_port
+        self.access_log = AccessLog(access_log) if access_log else None
+        self.autoindex = autoindex
+        self.ssl_context = create_ssl_context(certfile, keyfile) if certfile else None
+
+        # whole-phase deadlines, a socket timeout only bounds each recv or send call
+        self.header_timeout = header_timeout
+        self.keep_alive_timeout = keep_alive_timeout
+        self.write_timeout = write_timeout
+        # event loop workers only, counted per worker process
+        self.max_connections_per_ip = max_connections_per_ip
+        self.connections_per_ip = Counter()
+        self.shutdown_timeout = shutdown_timeout
+        self.handoff_socket = handoff_socket
+        self.handoff_peer = None
+        self.handed_off = False
+
+        # graceful shutdown: stop accepting and answer with "Connection: close", after a grace period
+        # close keep-alive connections that are still idle, let active ones finish until the deadline
+        self.stopping = threading.Event()
+        self.closing_idle = threading.Event()
+        self.handlers = set()
+        self.handlers_lock = threading.Lock()
+
+        # admission control of the thread pool: at most max_workers running and max_pending queued connections
+        self.slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self.accepted_connections = 0
+        # keep-alive connections handed back to the pool by the idle selector, each needs a slot again
+        self.resumed_connections = 0
+        # finished by a pool worker, failed TLS handshakes included, status port connections never counted
+        self.finished_connections = 0
+        self.finished_lock = threading.Lock()
+        self.executor = None
+        self.futures = set()
+        self.futures_lock = threading.Lock()
+        self.idle_connections = None
+        # rejected from the accept loop and, for resumed keep-alive connections, from the idle selector thread
+        self.shed_connections = 0
+        self.shed_lock = threading.Lock()
+        metrics.register_collector("httpd_shed_connections_total", "counter",
+                                   "Connections rejected with 503 because the pool was full",
+                                   lambda: self.shed_connections)
+        metrics.register_collector("httpd_queue_depth", "gauge", "Accepted connections waiting for a worker thread",
+                                   lambda: self.stats()["queue_depth"])
+        metrics.register_collector("httpd_idle_connections", "gauge",
+                                   "Keep-alive connections parked on the idle selector",
+                                   lambda: self.stats()["idle_connections"])
+
+    def stats(self) -> dict:
+        in_flight = self.accepted_connections + self.resumed_connections - self.finished_connections
+        return {
+            "accepted_connections": self.accepted_connections,
+            "shed_connections": self.shed_connections,
+            "in_flight_connections": in_flight,
+            "queue_depth": max(in_flight - self.max_workers, 0),
+            "idle_connections": len(self.idle_connections) if self.idle_connections else 0,
+        }
+
+    def is_pool_saturated(self) -> bool:
+        """True while accepted connections are queued behind busy workers"""
+        in_flight = self.accepted_connections + self.resumed_connections - self.finished_connections
+        return in_flight > self.max_workers
+
+    def create_server_socket(self):
+        server = self.take_over_socket() if self.handoff_socket else None
+        if server is not None:
+            server.listen(self.backlog)
+            return server
 
-    def run_server_forever(self):
         server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, self.port))
+        server.listen(self.backlog)
+        logging.info(f'Listening on {self.host}:{self.port}')
+        return server
+
+    def take_over_socket(self) -> Optional[socket.socket]:
+        """Receives the listening socket of the server running on the handoff socket, if there is one"""
+        control = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         try:
-            server.bind((self.host, self.port))
-            server.listen(self.max_workers)
-            logging.info(f'Listening on {self.host}:{self.port}')
-            executor = ThreadPoolExecutor(max_workers=self.max_workers)
-            while True:
-                client_sock, address = server.accept()
-                client_sock.settimeout(TIME_OUT_SERVER)
-                executor.submit(ConnectHandler, client_sock, self.document_root, self.server_name)
+            control.settimeout(HANDOFF_TIMEOUT)
+            control.connect(self.handoff_socket)
+            _, fds, _, _ = socket.recv_fds(control, 16, 1)
+        except OSError:
+            control.close()
+            return None
+        if not fds:
+            control.close()
+            return None
+
+        self.handoff_peer = control
+        server = socket.socket(fileno=fds[0])
+        host, port = server.getsockname()[:2]
+        logging.info(f'Took over listening socket {host}:{port} from the running server')
+        return server
+
+    def run_handoff_listener(self, server):
+        """Passes the listening socket to a new server process with SCM_RIGHTS and shuts down once it is ready"""
+        try:
+            os.unlink(self.handoff_socket)
+        except FileNotFoundError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.handoff_socket)
+        listener.listen(1)
+        while True:
+            conn, _ = listener.accept()
+            with conn:
+                try:
+                    conn.settimeout(HANDOFF_TIMEOUT)
+                    socket.send_fds(conn, [b"listen"], [server.fileno()])
+                    ready = conn.recv(16)
+                except OSError as error:
+                    logging.warning(f"Listening socket handoff failed: {error}")
+                    continue
+            if ready == b"ready":
+                break
+
+        logging.info("Listening socket handed off, shutting down")
+        self.handed_off = True
+        listener.close()
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def notify_handoff_ready(self):
+        """Tells the previous server process to stop accepting and drain"""
+        try:
+            self.handoff_peer.sendall(b"ready")
+        except OSError as error:
+            logging.warning(f"Previous server was not notified: {error}")
+        finally:
+            self.handoff_peer.close()
+            self.handoff_peer = None
+
+    def run_server_forever(self):
+        server = self.create_server_socket()
+        if self.status_port:
+            threading.Thread(target=self.run_status_server, name="StatusServer", daemon=True).start()
+        if self.handoff_socket:
+            threading.Thread(target=self.run_handoff_listener, args=(server,), name="Handoff", daemon=True).start()
+        if self.handoff_peer:
+            self.notify_handoff_ready()
+        try:
+            if self.backend == "asyncio":
+                self.run_event_loops(server)
+            else:
+                self.run_thread_pool(server)
         finally:
             server.close()
+            if self.handoff_socket and not self.handed_off:
+                try:
+                    os.unlink(self.handoff_socket)
+                except OSError:
+                    pass
+        logging.info("Server stopped")
 
+    def install_signal_handlers(self, handler: Callable):
+        if threading.current_thread() is threading.main_thread():
+            for signum in SHUTDOWN_SIGNALS:
+                signal.signal(signum, handler)
 
-class ConnectHandler:
-    def __init__(self, conn, document_root, server_name):
-        self.conn = conn
-        self.document_root = document_root
-        self.server_name = server_name
-        self.request = self.get_request(self.conn)
+    def register_handler(self, handler):
+        with self.handlers_lock:
+            self.handlers.add(handler)
+
+    def unregister_handler(self, handler):
+        with self.handlers_lock:
+            self.handlers.discard(handler)
+
+    def close_expired_connections(self):
+        now = time.monotonic()
+        with self.handlers_lock:
+            handlers = list(self.handlers)
+        for handler in handlers:
+            deadline = handler.deadline
+            if deadline is not None and deadline <= now:
+                phase, handler.deadline = handler.phase, None
+                metrics.inc("httpd_deadline_closed_total", phase)
+                # an idle connection has nothing left to send, it gets a regular close
+                handler.close_connection(abort=phase != "idle")
+
+    def run_deadline_reaper(self):
+        while True:
+            time.sleep(DEADLINE_CHECK_INTERVAL)
+            self.close_expired_connections()
+
+    async def reap_expired_connections(self):
+        while True:
+            await asyncio.sleep(DEADLINE_CHECK_INTERVAL)
+            self.close_expired_connections()
+
+    def close_connections(self, idle_only=True):
+        if idle_only:
+            self.closing_idle.set()
+        with self.handlers_lock:
+            handlers = list(self.handlers)
+        for handler in handlers:
+            if handler.idle or not idle_only:
+                handler.close_connection(abort=not idle_only)
+
+    def run_thread_pool(self, server):
+        date_header.start()
+        if self.access_log:
+            self.access_log.start()
+        self.install_signal_handlers(lambda signum, frame: self.stopping.set())
+        threading.Thread(target=self.run_deadline_reaper, name="DeadlineReaper", daemon=True).start()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.idle_connections = IdleConnections(self)
+        self.idle_connections.start()
+        # wake up regularly to notice shutdown; accept is still immediate when connections are waiting
+        server.settimeout(ACCEPT_POLL_INTERVAL)
+        last_report, reported_shed = time.monotonic(), 0
+        while not self.stopping.is_set():
+            if self.overload == "pause" and not self.slots.acquire(timeout=ACCEPT_POLL_INTERVAL):
+                # stop accepting until a slot frees up, new connections wait in the listen backlog
+                continue
+            try:
+                client_sock, address = server.accept()
+            except socket.timeout:
+                if self.overload == "pause":
+                    self.slots.release()
+                continue
+            accepted_at = time.monotonic()
+            if self.overload == "reject" and not self.slots.acquire(blocking=False):
+                self.reject(client_sock)
+                if time.monotonic() - last_report >= OVERLOAD_LOG_INTERVAL:
+                    logging.warning(f"Overloaded: shed {self.shed_connections - reported_shed} connections, "
+                                    f"{self.stats()}")
+                    last_report, reported_shed = time.monotonic(), self.shed_connections
+                continue
+
+            self.accepted_connections += 1
+            client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client_sock.settimeout(TIME_OUT_SERVER)
+            self.submit(self.handle_connection, client_sock, accepted_at)
+
+        server.close()
+        self.drain_thread_pool()
+        self.idle_connections.close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, fn, *args):
+        future = self.executor.submit(fn, *args)
+        with self.futures_lock:
+            self.futures.add(future)
+        future.add_done_callback(self.discard_future)
+
+    def discard_future(self, future):
+        with self.futures_lock:
+            self.futures.discard(future)
+
+    def pending_futures(self) -> list:
+        with self.futures_lock:
+            return list(self.futures)
+
+    def drain_thread_pool(self):
+        futures, idle = self.pending_futures(), len(self.idle_connections)
+        logging.info(f"Shutting down: waiting up to {self.shutdown_timeout}s for {len(futures) + idle} connections")
+        deadline = time.monotonic() + self.shutdown_timeout
+        grace_end = time.monotonic() + min(SHUTDOWN_IDLE_GRACE, self.shutdown_timeout)
+        # a request already sent on an idle keep-alive connection still gets its "Connection: close" answer
+        _, not_done = wait(futures, timeout=grace_end - time.monotonic())
+        if not_done or idle:
+            # parked connections are served by new workers during the grace period, then closed by the selector
+            time.sleep(max(grace_end - time.monotonic(), 0))
+            self.close_connections(idle_only=True)
+            _, not_done = wait(self.pending_futures(), timeout=max(deadline - time.monotonic(), 0))
+        if not_done:
+            logging.warning(f"Shutdown timeout: closing {len(not_done)} connections")
+            self.close_connections(idle_only=False)
+
+    def handle_connection(self, client_sock, accepted_at):
+        handler, idle = None, False
+        try:
+            if self.ssl_context:
+                client_sock = self.wrap_tls(client_sock, accepted_at)
+                if client_sock is None:
+                    return
+            handler = ConnectHandler(client_sock, self, accepted_at)
+            idle = handler.run()
+        finally:
+            self.finish_connection()
+        if idle:
+            self.park(handler)
+
+    def finish_connection(self):
+        with self.finished_lock:
+            self.finished_connections += 1
+        self.slots.release()
+
+    def park(self, handler):
+        """Hands an idle keep-alive connection, its slot already released, to the idle selector"""
+        if self.idle_connections is None or not self.idle_connections.park(handler):
+            handler.close()
+
+    def resume_connection(self, handler):
+        """Called by the idle selector once a parked connection is readable, it needs a free slot like a new one"""
+        if not self.slots.acquire(blocking=False):
+            # read the request first, closing with unread data resets the connection before the 503 arrives
+            try:
+                handler.conn.setblocking(False)
+                handler.conn.recv(MAX_HEADER_SIZE)
+            except OSError:
+                pass
+            self.reject(handler.conn)
+            handler.close()
+            return
+        self.resumed_connections += 1
+        self.submit(self.serve_resumed, handler)
 
+    def serve_resumed(self, handler):
+        idle = False
+        try:
+            idle = handler.run()
+        finally:
+            self.finish_connection()
+        if idle:
+            self.park(handler)
+
+    def wrap_tls(self, client_sock, accepted_at: float) -> Optional[ssl.SSLSocket]:
+        """Runs the TLS handshake in the worker thread, the reaper closes it once the header deadline passes"""
+        tls_sock, handshake = client_sock, None
+        try:
+            tls_sock = self.ssl_context.wrap_socket(client_sock, server_side=True, do_handshake_on_connect=False)
+            handshake = PendingHandshake(tls_sock, accepted_at + self.header_timeout)
+            self.register_handler(handshake)
+            tls_sock.do_handshake()
+        except OSError as error:
+            metrics.inc("httpd_tls_handshake_errors_total")
+            logging.debug(f"TLS handshake failed: {error}")
+            tls_sock.close()
+            return None
+        finally:
+            if handshake is not None:
+                self.unregister_handler(handshake)
+        count_tls_handshake(tls_sock)
+        return tls_sock
+
+    def run_status_server(self):
+        """Serves the metrics page on its own port, one connection at a time"""
+        status_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        status_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        status_server.bind((self.host, self.status_port))
+        status_server.listen(self.backlog)
+        logging.info(f'Status page on {self.host}:{self.status_port}')
+        while True:
+            client_sock, address = status_server.accept()
+            client_sock.settimeout(TIME_OUT_SERVER)
+            StatusConnectHandler(client_sock, self, time.monotonic()).run()
+
+    def unavailable_response(self) -> bytes:
+        return b"".join([status_header(HTTPStatus.SERVICE_UNAVAILABLE, self.server_name), date_header.value,
+                         b"Retry-After: 1\r\nContent-Length: 0\r\n", CONNECTION_HEADERS[False], b"\r\n"])
+
+    def reject(self, client_sock):
+        """Answers 503 without reading the request and closes the connection"""
+        with self.shed_lock:
+            self.shed_connections += 1
+        response = self.unavailable_response()
+        try:
+            client_sock.setblocking(False)
+            client_sock.send(response)
+        except OSError:
+            pass
+        finally:
+            client_sock.close()
+
+    def run_event_loops(self, server):
+        """Runs one event loop per worker process, all accepting on the shared listening socket"""
+        if self.max_workers == 1:
+            self.run_event_loop(server)
+            return
+
+        # workers inherit the server by forking, spawn and forkserver would have to pickle its locks and SSL context
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=self.run_event_loop, args=(server,), daemon=True)
+                   for _ in range(self.max_workers)]
+        for worker in workers:
+            worker.start()
+
+        def stop_workers(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    os.kill(worker.pid, signal.SIGTERM)
+
+        self.install_signal_handlers(stop_workers)
+        try:
+            for worker in workers:
+                worker.join()
+        finally:
+            for worker in workers:
+                worker.terminate()
+
+    def run_event_loop(self, server):
+        date_header.start()
+        if self.access_log:
+            self.access_log.start()
+        try:
+            import uvloop
+        except ImportError:
+            logging.debug("uvloop is not installed, using the default event loop")
+        else:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+        try:
+            asyncio.run(self.serve_async(server))
+        except KeyboardInterrupt:
+            pass
+
+    async def serve_async(self, server):
+        async def handle_client(reader, writer):
+            accepted_at = time.monotonic()
+            peername = writer.get_extra_info("peername")
+            address = peername[0] if peername else None
+            if self.max_connections_per_ip and self.connections_per_ip[address] >= self.max_connections_per_ip:
+                metrics.inc("httpd_per_ip_rejected_total")
+                await self.reject_async(reader, writer)
+                return
+
+            writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            ssl_object = writer.get_extra_info("ssl_object")
+            if ssl_object is not None:
+                count_tls_handshake(ssl_object)
+            self.connections_per_ip[address] += 1
+            try:
+                await AsyncConnectHandler(reader, writer, self, accepted_at).run()
+            finally:
+                self.connections_per_ip[address] -= 1
+                if not self.connections_per_ip[address]:
+                    del self.connections_per_ip[address]
+
+        loop = asyncio.get_running_loop()
+        stop_requested = asyncio.Event()
+        for signum in SHUTDOWN_SIGNALS:
+            loop.add_signal_handler(signum, stop_requested.set)
+
+        tls_options = {}
+        if self.ssl_context:
+            tls_options = {"ssl": self.ssl_context, "ssl_handshake_timeout": self.header_timeout}
+        async_server = await asyncio.start_server(handle_client, sock=server, limit=MAX_HEADER_SIZE, **tls_options)
+        reaper = asyncio.ensure_future(self.reap_expired_connections())
+        await stop_requested.wait()
+        async_server.close()
+        self.stopping.set()
+        reaper.cancel()
+        await self.drain_event_loop()
+
+    async def reject_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answers 503 and lingers briefly, so the unread request doesn't turn the answer into a reset"""
+        try:
+            writer.write(self.unavailable_response())
+            writer.write_eof()
+            await asyncio.wait_for(reader.read(LINGER_MAX_SIZE), LINGER_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def drain_event_loop(self):
+        # connection tasks that were created but have not started yet are drained too
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        logging.info(f"Shutting down: waiting up to {self.shutdown_timeout}s for {len(tasks)} connections")
+        if not tasks:
+            return
+        deadline = time.monotonic() + self.shutdown_timeout
+        _, not_done = await asyncio.wait(tasks, timeout=min(SHUTDOWN_IDLE_GRACE, self.shutdown_timeout))
+        if not_done:
+            self.close_connections(idle_only=True)
+            _, not_done = await asyncio.wait(not_done, timeout=max(deadline - time.monotonic(), 0))
+        if not_done:
+            logging.warning(f"Shutdown timeout: closing {len(not_done)} connections")
+            for task in not_done:
+                task.cancel()
+            await asyncio.wait(not_done)
+
+
+class RequestHandler:
+    """Routing and response building shared by the connection handlers of every backend"""
+
+    def __init__(self, server: Server, accepted_at: float = None):
+        self.server = server
+        self.document_root = server.document_root
+        self.server_name = server.server_name
+        self.parser = RequestParser()
+        self.method, self.uri, self.http_ver, self.headers = None, None, None, {}
+        self.request_line = None
+        self.keep_alive = False
+        self.idle = False
+        self.phase = "header"
+        self.deadline = (accepted_at or time.monotonic()) + server.header_timeout
+        self.request_started = accepted_at
+        self.first_byte_at = None
+        self.response_head_size = 0
+
+    def reset_response(self):
+        self.request_line = None
         self.response_status = None
         self.response_data = None
-        self.response_header = {
-            'Date': datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT'),
-            'Server': self.server_name,
-        }
+        self.response_file = None
+        self.response_body = []
+        self.content_type = None
+        self.response_headers = []
 
-        self.method, self.uri, self.http_ver = self.parse_request()
-        self.method_handler()
+    def add_header(self, name: str, value):
+        self.response_headers.append(f"{name}: {value}\r\n".encode())
 
-    @staticmethod
-    def get_request(conn):
-        request = b''
-        while b"\r\n\r\n" not in request:
-            chunk = conn.recv(1024)
-            request += chunk
-            if not chunk:
-                raise ConnectionError
-        return request.rstrip()
+    def is_keep_alive(self) -> bool:
+        if self.method not in VALID_METHODS:
+            # request body is never read, so the connection can't be reused
+            return False
+        if self.server.stopping.is_set():
+            return False
+        connection = self.headers.get("connection", "").lower()
+        if self.http_ver == "HTTP/1.1":
+            return "close" not in connection
+        return "keep-alive" in connection
 
-    def parse_request(self):
-        lines = self.request.decode().split("\r\n")
-        method, url, http_ver = lines[0].split(" ")
-        url = urllib.parse.unquote(url, encoding='utf-8', errors='replace')
-        clear_url = urllib.parse.urlparse(url).path
-        return method, clear_url, http_ver
+    def set_phase(self, phase: str, timeout: Optional[float]):
+        """Starts a connection phase, the deadline reaper closes the connection if it outlives its timeout"""
+        self.phase = phase
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def handle_request(self, request: Request) -> bool:
+        self.set_phase("handle", None)
+        self.method, self.uri, self.http_ver, self.headers = request.method, request.uri, request.http_ver, \
+            request.headers
+        self.request_line = f"{request.method} {request.target} {request.http_ver}"
+        self.keep_alive = self.is_keep_alive()
+        return self.method_handler()
+
+    def handle_error(self, error: HTTPError):
+        self.keep_alive = False
+        self.response_status = error.status
+
+    def finish_request(self, is_send_data: bool):
+        finished_at = time.monotonic()
+        body_bytes_sent = self.content_length() if is_send_data else 0
+        metrics.inc("httpd_requests_total", self.response_status.value)
+        metrics.inc("httpd_bytes_sent_total", value=self.response_head_size + body_bytes_sent)
+        request_time = 0.0
+        if self.request_started is not None:
+            request_time = finished_at - self.request_started
+            metrics.observe("httpd_time_to_first_byte_seconds", self.first_byte_at - self.request_started)
+            metrics.observe("httpd_request_duration_seconds", request_time)
+        if self.server.access_log:
+            self.server.access_log.log((self.peer_address(), time.time(), self.request_line or "-",
+                                        self.response_status.value, body_bytes_sent, self.headers, request_time))
+        self.request_started = None
+        self.set_phase("idle", self.server.keep_alive_timeout)
+
+    def peer_address(self) -> str:
+        return "-"
 
-    def method_handler(self):
+    def close_connection(self, abort=False):
+        """Closes the connection from another thread or task; abort also drops data the client hasn't read"""
+
+    def method_handler(self) -> bool:
         is_send_data = True
         if self.method in VALID_METHODS:
             self.request_method()
@@ -87,70 +1195,609 @@ class ConnectHandler:
                 is_send_data = False
         else:
             self.response_status = HTTPStatus.METHOD_NOT_ALLOWED
-
-        response = self.create_response(is_send_data)
-        self.send_response(response)
+        return is_send_data
 
     def request_method(self):
-        path = os.path.abspath(self.document_root + self.uri)
-        if os.path.exists(path) and "../" not in self.uri:
-            if os.path.isfile(path) and not self.uri.endswith("/"):
-                with open(path, 'rb') as data:
-                    self.response_data = data.read()
-                    self.response_status = HTTPStatus.OK
-                    self.response_header["Content-Type"] = self.define_content_type(path)
-
-            elif self.check_index_file(path):
-                self.response_status = HTTPStatus.OK
-                self.response_header["Content-Type"] = "text/html"
-                self.response_data = b"<html>Directory index file</html>\n"
-
-            elif os.path.isfile(path) and self.uri.endswith("/"):
-                self.response_status = HTTPStatus.NOT_FOUND
+        if self.server.status_path and self.uri == self.server.status_path:
+            self.serve_status()
+            return
+
+        path_info = self.resolve_path()
+        if path_info.kind == "file" and not self.uri.endswith("/"):
+            self.serve_file(path_info.path, path_info.stat)
+
+        elif path_info.kind == "index":
+            self.serve_file(path_info.path, path_info.stat)
+
+        elif path_info.kind == "dir" and self.server.autoindex:
+            self.serve_autoindex(path_info.path, path_info.stat)
 
-            else:
-                self.response_status = HTTPStatus.NOT_FOUND
         else:
             self.response_status = HTTPStatus.NOT_FOUND
 
-    def send_response(self, response):
-        self.conn.sendall(response)
-        self.conn.close()
+    def serve_status(self):
+        self.response_status = HTTPStatus.OK
+        self.content_type = STATUS_CONTENT_TYPE
+        self.response_data = metrics.render().encode()
+        self.response_body = [(0, len(self.response_data))]
 
-    @staticmethod
-    def check_index_file(path):
-        if os.path.isdir(path):
-            list_files = os.listdir(path)
-            return 'index.html' in list_files
+    def serve_autoindex(self, path: str, stat: os.stat_result):
+        """Serves a directory listing, rendered again only when the directory mtime changes"""
+        key = (path, self.uri)
+        cached = autoindex_cache.get(key)
+        if cached is not None and cached[0] == stat.st_mtime_ns:
+            listing = cached[1]
         else:
+            try:
+                listing = self.render_autoindex(path, self.uri)
+            except OSError:
+                self.response_status = HTTPStatus.NOT_FOUND
+                return
+            autoindex_cache.set(key, (stat.st_mtime_ns, listing))
+
+        self.add_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+        self.response_status = HTTPStatus.OK
+        self.content_type = AUTOINDEX_CONTENT_TYPE
+        self.response_data = listing
+        self.response_body = [(0, len(listing))]
+
+    @staticmethod
+    def render_autoindex(path: str, uri: str) -> bytes:
+        base = uri if uri.endswith("/") else uri + "/"
+        entries = []
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                    entry_stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((not is_dir, entry.name, is_dir, entry_stat))
+        entries.sort()
+
+        title = html.escape(f"Index of {base}")
+        lines = [f"<html>\n<head><title>{title}</title></head>\n<body>\n<h1>{title}</h1><hr><pre>"]
+        if base != "/":
+            lines.append('<a href="../">../</a>')
+        for _, name, is_dir, entry_stat in entries:
+            name = name + "/" if is_dir else name
+            modified = time.strftime("%d-%b-%Y %H:%M", time.gmtime(entry_stat.st_mtime))
+            size = "-" if is_dir else str(entry_stat.st_size)
+            href = urllib.parse.quote(base + name)
+            lines.append(f'<a href="{href}">{html.escape(name)}</a>{" " * max(51 - len(name), 1)}'
+                         f'{modified} {size:>19}')
+        lines.append("</pre><hr></body>\n</html>\n")
+        return "\n".join(lines).encode("utf-8", errors="replace")
+
+    def resolve_path(self) -> PathInfo:
+        key = (self.document_root, self.uri)
+        path_info = path_cache.get(key)
+        if path_info is None:
+            path_info = self.stat_path(self.uri)
+            path_cache.set(key, path_info)
+        return path_info
+
+    def is_inside_root(self, path: str) -> bool:
+        """False when "..", "/%2e%2e" or a symlink anywhere on the path lead outside the document root"""
+        root = os.path.realpath(self.document_root)
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+    def stat_path(self, uri: str) -> PathInfo:
+        path = os.path.abspath(self.document_root + uri)
+        if not self.is_inside_root(path):
+            return PathInfo(path, None, None)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return PathInfo(path, None, None)
+
+        if stat_module.S_ISREG(stat.st_mode):
+            return PathInfo(path, "file", stat)
+        if not stat_module.S_ISDIR(stat.st_mode):
+            return PathInfo(path, None, stat)
+
+        index_path = os.path.join(path, INDEX_FILE)
+        try:
+            index_stat = os.stat(index_path)
+        except OSError:
+            return PathInfo(path, "dir", stat)
+        if stat_module.S_ISREG(index_stat.st_mode) and self.is_inside_root(index_path):
+            return PathInfo(index_path, "index", index_stat)
+        return PathInfo(path, "dir", stat)
+
+    def serve_file(self, path: str, stat: os.stat_result):
+        content_type = self.define_content_type(path)
+        encoding, path, stat, data = self.select_encoding(path, stat, content_type)
+
+        etag = self.create_etag(stat, encoding)
+        self.add_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+        self.add_header("ETag", etag)
+        if self.is_not_modified(etag, stat.st_mtime):
+            self.response_status = HTTPStatus.NOT_MODIFIED
+            return
+
+        size = stat.st_size if data is None else len(data)
+        self.response_file = path if data is None else None
+        self.response_data = data
+        self.response_status = HTTPStatus.OK
+        self.content_type = content_type
+        if encoding:
+            self.add_header("Content-Encoding", encoding)
+        self.response_headers.append(ACCEPT_RANGES_HEADER)
+        self.response_body = [(0, size)]
+        if "range" in self.headers and self.is_range_fresh(etag, stat.st_mtime):
+            self.apply_ranges(size)
+
+    def select_encoding(self, path: str, stat: os.stat_result, content_type: str):
+        """Returns (content encoding, file path, file stat, in-memory body) of the representation to send"""
+        if content_type not in COMPRESSIBLE_TYPES:
+            return None, path, stat, None
+
+        self.response_headers.append(VARY_HEADER)
+        accepted = self.parse_accept_encoding()
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+            if encoding not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            # a stale or symlinked-out sibling is never served in place of the file
+            if variant_stat.st_mtime >= stat.st_mtime and self.is_inside_root(path + suffix):
+                return encoding, path + suffix, variant_stat, None
+
+        if "gzip" in accepted and GZIP_MIN_SIZE <= stat.st_size <= GZIP_MAX_SIZE:
+            return "gzip", path, stat, self.compress_file(path, stat)
+        return None, path, stat, None
+
+    def parse_accept_encoding(self) -> set:
+        accepted = set()
+        for item in self.headers.get("accept-encoding", "").split(","):
+            coding, _, params = item.partition(";")
+            name, _, quality = params.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    if float(quality) <= 0:
+                        continue
+                except ValueError:
+                    continue
+            if coding.strip():
+                accepted.add(coding.strip().lower())
+        return accepted
+
+    @staticmethod
+    def compress_file(path: str, stat: os.stat_result) -> bytes:
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        data = compressed_cache.get(key)
+        if data is None:
+            with open(path, "rb") as file:
+                data = gzip.compress(file.read(), compresslevel=GZIP_LEVEL, mtime=0)
+            compressed_cache.set(key, data)
+        return data
+
+    @staticmethod
+    def create_etag(stat: os.stat_result, encoding: str = None) -> str:
+        if encoding:
+            return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding}"'
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def is_not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 7232, 3.3)
+            if if_none_match.strip() == "*":
+                return True
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return etag in tags
+
+        if_modified_since = self.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since.timestamp()
+        return False
+
+    def is_range_fresh(self, etag: str, mtime: float) -> bool:
+        if_range = self.headers.get("if-range")
+        if if_range is None:
+            return True
+        if if_range.startswith('"'):
+            return if_range == etag
+        try:
+            return int(mtime) == parsedate_to_datetime(if_range).timestamp()
+        except (TypeError, ValueError):
             return False
 
+    @staticmethod
+    def parse_ranges(range_header: str, size: int):
+        """Returns list of (offset, count) or None if the header must be ignored"""
+        unit, _, specs = range_header.partition("=")
+        if unit.strip().lower() != "bytes":
+            return None
+
+        ranges = []
+        for spec in specs.split(","):
+            first, sep, last = spec.strip().partition("-")
+            if not sep or not (first or last):
+                return None
+            try:
+                if not first:
+                    start, end = max(size - int(last), 0), size - 1
+                else:
+                    start = int(first)
+                    end = min(int(last), size - 1) if last else size - 1
+            except ValueError:
+                return None
+            if start < 0 or (last and first and int(last) < start):
+                return None
+            if start < size and end >= start:
+                ranges.append((start, end - start + 1))
+        return ranges if len(ranges) <= MAX_RANGES else None
+
+    def apply_ranges(self, size: int):
+        ranges = self.parse_ranges(self.headers["range"], size)
+        if ranges is None:
+            return
+
+        if not ranges:
+            self.response_status = HTTPStatus.RANGE_NOT_SATISFIABLE
+            self.add_header("Content-Range", f"bytes */{size}")
+            self.content_type = None
+            self.response_file = None
+            self.response_data = None
+            self.response_body = []
+            return
+
+        self.response_status = HTTPStatus.PARTIAL_CONTENT
+        if len(ranges) == 1:
+            offset, count = ranges[0]
+            self.add_header("Content-Range", f"bytes {offset}-{offset + count - 1}/{size}")
+            self.response_body = ranges
+            return
+
+        boundary = uuid.uuid4().hex
+        content_type = self.content_type
+        self.content_type = f"multipart/byteranges; boundary={boundary}"
+        self.response_body = []
+        for offset, count in ranges:
+            part_header = (f"\r\n--{boundary}\r\n"
+                           f"Content-Type: {content_type}\r\n"
+                           f"Content-Range: bytes {offset}-{offset + count - 1}/{size}\r\n\r\n")
+            self.response_body.append(part_header.encode())
+            self.response_body.append((offset, count))
+        self.response_body.append(f"\r\n--{boundary}--\r\n".encode())
+
+    def content_length(self):
+        return sum(len(part) if isinstance(part, bytes) else part[1] for part in self.response_body)
+
     @staticmethod
     def define_content_type(file_path: str) -> str:
         _, file_extension = os.path.splitext(file_path)
-        return mimetypes.types_map[file_extension]
+        return mimetypes.types_map.get(file_extension.lower(), "application/octet-stream")
 
-    @staticmethod
-    def create_status_line(http_status: HTTPStatus):
-        return f"HTTP/1.1 {http_status.value} {http_status.name}".encode()
+    def create_response(self) -> list:
+        """Returns the response head as a list of encoded header lines, ready for a scatter-gather write"""
+        response = [status_header(self.response_status, self.server_name), date_header.value]
+        if self.content_type:
+            response.append(content_type_header(self.content_type))
+        response.extend(self.response_headers)
+        if self.response_status is not HTTPStatus.NOT_MODIFIED:
+            response.append(b"Content-Length: %d\r\n" % self.content_length())
+        response.append(CONNECTION_HEADERS[self.keep_alive])
+        response.append(b"\r\n")
+        self.response_head_size = sum(len(line) for line in response)
+        return response
 
-    def create_header(self):
-        headers = ""
-        if self.response_data:
-            self.response_header["Content-Length"] = len(self.response_data)
 
-        for key, value in self.response_header.items():
-            headers += f"{key}: {value}\r\n"
-        return headers.encode()
+class ConnectHandler(RequestHandler):
+    # between keep-alive requests the connection waits on the server's idle selector, not in a worker thread
+    parkable = True
 
-    def create_response(self, is_send_data=True):
-        status_line = self.create_status_line(self.response_status)
-        headers = self.create_header()
-        response = status_line + b"\r\n" + headers + b"\r\n"
+    def __init__(self, conn, server: Server, accepted_at: float = None):
+        super().__init__(server, accepted_at)
+        self.conn = conn
+        self.tls = isinstance(conn, ssl.SSLSocket)
+        metrics.inc("httpd_connections_opened_total")
 
-        if self.response_data and is_send_data:
-            response += self.response_data + b"\r\n"
-        return response
+    def run(self) -> bool:
+        """Serves requests until the connection is closed, True when it went idle and is left open for parking"""
+        self.server.register_handler(self)
+        idle = False
+        try:
+            idle = self.handle_connection()
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            # unregistered before parking, the selector may hand the connection to another worker right away
+            self.server.unregister_handler(self)
+            if not idle:
+                self.close()
+        return idle
+
+    def close(self):
+        self.conn.close()
+        metrics.inc("httpd_connections_closed_total")
+
+    def is_keep_alive(self) -> bool:
+        # with connections queued for a worker, closing after the response frees this one for them
+        return super().is_keep_alive() and not (self.parkable and self.server.is_pool_saturated())
+
+    def can_park(self) -> bool:
+        # a pipelined request already read, or TLS data decrypted ahead, won't wake up the selector
+        return self.parkable and not self.parser.pending and not (self.tls and self.conn.pending())
+
+    def wait_next_request(self) -> bool:
+        """Waits briefly for the next request while no connection is queued, parking it costs two thread switches"""
+        wait_until = time.monotonic() + KEEP_ALIVE_INLINE_WAIT
+        # poll, unlike select.select, takes descriptors above FD_SETSIZE
+        poller = select.poll()
+        poller.register(self.conn, select.POLLIN)
+        while not self.server.is_pool_saturated():
+            timeout = wait_until - time.monotonic()
+            if timeout <= 0:
+                return False
+            if poller.poll(min(timeout, KEEP_ALIVE_INLINE_SLICE) * 1000):
+                return True
+        return False
+
+    def handle_connection(self) -> bool:
+        """Returns True when the connection went idle and should be parked"""
+        self.keep_alive = True
+        while self.keep_alive:
+            self.reset_response()
+            try:
+                request = self.read_request()
+            except HTTPError as error:
+                self.handle_error(error)
+                self.send_response(self.create_response(), is_send_data=False)
+                self.finish_request(is_send_data=False)
+                self.linger_close()
+                return False
+            if request is None:
+                return False
+
+            is_send_data = self.handle_request(request)
+            self.send_response(self.create_response(), is_send_data)
+            self.finish_request(is_send_data)
+            if self.keep_alive and self.can_park() and not self.wait_next_request():
+                return True
+        return False
+
+    def peer_address(self) -> str:
+        try:
+            return self.conn.getpeername()[0]
+        except OSError:
+            return "-"
+
+    def close_connection(self, abort=False):
+        # wakes up a blocked recv or send in the handler thread
+        try:
+            if abort:
+                self.conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, ABORT_LINGER)
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def linger_close(self):
+        """Drains unread request bytes so the error response isn't lost to a TCP reset"""
+        self.conn.shutdown(socket.SHUT_WR)
+        self.conn.settimeout(LINGER_TIMEOUT)
+        drained = 0
+        while drained < LINGER_MAX_SIZE:
+            chunk = self.conn.recv(LINGER_MAX_SIZE)
+            if not chunk:
+                break
+            drained += len(chunk)
+
+    def read_request(self) -> Optional[Request]:
+        request = self.parser.next_request()
+        while request is None:
+            # between keep-alive requests the connection may be closed by graceful shutdown
+            self.idle = self.request_started is None
+            if self.idle and self.server.closing_idle.is_set():
+                return None
+            received = self.parser.recv_into(self.conn)
+            self.idle = False
+            if not received:
+                return None
+            if self.request_started is None:
+                self.request_started = time.monotonic()
+                self.set_phase("header", self.server.header_timeout)
+            request = self.parser.next_request()
+        if self.request_started is None:
+            self.request_started = time.monotonic()
+        return request
+
+    def send_response(self, response, is_send_data=True):
+        self.first_byte_at = time.monotonic()
+        self.set_phase("write", self.server.write_timeout)
+        if not is_send_data or self.response_file is None and self.response_data is None:
+            self.send_buffers(response)
+        elif self.response_data is not None:
+            data = memoryview(self.response_data)
+            response.extend(part if isinstance(part, bytes) else data[part[0]:part[0] + part[1]]
+                            for part in self.response_body)
+            self.send_buffers(response)
+        else:
+            self.send_file(response)
+
+    def send_buffers(self, buffers):
+        if not self.tls:
+            send_buffers(self.conn, buffers)
+        elif buffers:
+            # SSLSocket has no sendmsg, a single write of the joined buffers still fills whole TLS records
+            self.conn.sendall(b"".join(buffers))
+
+    def send_file(self, pending):
+        """Sends file segments with sendfile, batching the byte chunks between them into one sendmsg"""
+        with open(self.response_file, "rb") as file:
+            for part in self.response_body:
+                if isinstance(part, bytes):
+                    pending.append(part)
+                    continue
+                self.send_buffers(pending)
+                pending = []
+                offset, count = part
+                if self.tls:
+                    self.send_file_buffered(file, offset, count)
+                else:
+                    self.conn.sendfile(file, offset, count)
+        self.send_buffers(pending)
+
+    def send_file_buffered(self, file, offset: int, count: int):
+        """Copies a file segment through user space, the kernel can't encrypt a sendfile for TLS"""
+        buffer = bytearray(min(count, TLS_SEND_SIZE))
+        view = memoryview(buffer)
+        file.seek(offset)
+        while count > 0:
+            size = file.readinto(view[:min(count, len(buffer))])
+            if not size:
+                raise OSError(f"{self.response_file} is shorter than expected")
+            self.conn.sendall(view[:size])
+            count -= size
+
+
+class StatusConnectHandler(ConnectHandler):
+    """Answers every GET with the metrics page, used for the separate status port"""
+
+    # the status port serves one connection at a time in its own thread, outside the pool
+    parkable = False
+
+    def request_method(self):
+        self.serve_status()
+
+
+class AsyncConnectHandler(RequestHandler):
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server: Server,
+                 accepted_at: float = None):
+        super().__init__(server, accepted_at)
+        self.reader = reader
+        self.writer = writer
+
+    async def run(self):
+        metrics.inc("httpd_connections_opened_total")
+        self.server.register_handler(self)
+        try:
+            await self.handle_connection()
+        except (OSError, ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.server.unregister_handler(self)
+            self.writer.close()
+            metrics.inc("httpd_connections_closed_total")
+
+    async def handle_connection(self):
+        self.keep_alive = True
+        while self.keep_alive:
+            self.reset_response()
+            try:
+                request = await self.read_request()
+            except HTTPError as error:
+                self.handle_error(error)
+                await self.send_response(self.create_response(), is_send_data=False)
+                self.finish_request(is_send_data=False)
+                await self.linger_close()
+                return
+            if request is None:
+                return
+
+            is_send_data = self.handle_request(request)
+            await self.send_response(self.create_response(), is_send_data)
+            self.finish_request(is_send_data)
+
+    def peer_address(self) -> str:
+        peername = self.writer.get_extra_info("peername")
+        return peername[0] if peername else "-"
+
+    def close_connection(self, abort=False):
+        # a pending read sees end of stream once the transport is closed
+        if not abort:
+            self.writer.close()
+            return
+        sock = self.writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, ABORT_LINGER)
+        self.writer.transport.abort()
+
+    async def linger_close(self):
+        self.writer.write_eof()
+        drained = 0
+        while drained < LINGER_MAX_SIZE:
+            chunk = await asyncio.wait_for(self.reader.read(LINGER_MAX_SIZE), LINGER_TIMEOUT)
+            if not chunk:
+                break
+            drained += len(chunk)
+
+    async def read_request(self) -> Optional[Request]:
+        request = self.parser.next_request()
+        while request is None:
+            self.idle = self.request_started is None
+            if self.idle and self.server.closing_idle.is_set():
+                return None
+            if not self.parser.free_space:
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            # never read past the parser buffer, the thread backend's recv_into has the same limit
+            read_size = min(READ_SIZE, self.parser.free_space)
+            chunk = await asyncio.wait_for(self.reader.read(read_size), TIME_OUT_SERVER)
+            self.idle = False
+            if not chunk:
+                return None
+            if self.request_started is None:
+                self.request_started = time.monotonic()
+                self.set_phase("header", self.server.header_timeout)
+            self.parser.feed(chunk)
+            request = self.parser.next_request()
+        if self.request_started is None:
+            self.request_started = time.monotonic()
+        return request
+
+    async def send_response(self, response, is_send_data=True):
+        self.first_byte_at = time.monotonic()
+        self.set_phase("write", self.server.write_timeout)
+        self.writer.writelines(response)
+        if is_send_data:
+            await self.send_body()
+        await asyncio.wait_for(self.writer.drain(), TIME_OUT_SERVER)
+
+    async def send_body(self):
+        if self.response_data is not None:
+            data = memoryview(self.response_data)
+            for part in self.response_body:
+                if isinstance(part, bytes):
+                    self.writer.write(part)
+                else:
+                    offset, count = part
+                    self.writer.write(data[offset:offset + count])
+            return
+        if self.response_file is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        tls = self.writer.get_extra_info("ssl_object") is not None
+        with open(self.response_file, "rb") as file:
+            for part in self.response_body:
+                if isinstance(part, bytes):
+                    self.writer.write(part)
+                elif tls:
+                    await self.send_file_buffered(file, *part)
+                else:
+                    offset, count = part
+                    await loop.sendfile(self.writer.transport, file, offset, count)
+
+    async def send_file_buffered(self, file, offset: int, count: int):
+        """Copies a file segment in chunks with flow control, TLS transports have no sendfile"""
+        file.seek(offset)
+        while count > 0:
+            chunk = file.read(min(count, TLS_SEND_SIZE))
+            if not chunk:
+                raise OSError(f"{self.response_file} is shorter than expected")
+            self.writer.write(chunk)
+            count -= len(chunk)
+            await asyncio.wait_for(self.writer.drain(), TIME_OUT_SERVER)
 
 
 if __name__ == "__main__":
@@ -158,9 +1805,41 @@ if __name__ == "__main__":
     arg_pars.add_argument('--host', default="127.0.0.1")
     arg_pars.add_argument('-p', '--port', default=8080, type=int)
     arg_pars.add_argument('-s', '--server_name', default="OTUServer", help="Name server")
-    arg_pars.add_argument('-w', '--workers', default=1, type=int, help="Count workers")
+    arg_pars.add_argument('-w', '--workers', default=1, type=int,
+                          help="Count workers: threads, or event loop processes for the asyncio backend")
     arg_pars.add_argument('-r', '--document-root', default=DOCUMENT_ROOT, help='Document root folder')
+    arg_pars.add_argument('-b', '--backend', default="threads", choices=BACKENDS, help="Connection handling backend")
+    arg_pars.add_argument('--backlog', default=DEFAULT_BACKLOG, type=int, help="Listen backlog")
+    arg_pars.add_argument('--max-pending', default=DEFAULT_MAX_PENDING, type=int,
+                          help="Accepted connections allowed to wait for a free worker thread")
+    arg_pars.add_argument('--overload', default="reject", choices=OVERLOAD_POLICIES,
+                          help="When workers and pending queue are full: answer 503 or stop accepting")
+    arg_pars.add_argument('--status-path', default=None,
+                          help="Serve metrics in Prometheus text format on this path, e.g. /server-status")
+    arg_pars.add_argument('--status-port', default=None, type=int,
+                          help="Serve metrics on a separate port, not with several asyncio worker processes")
+    arg_pars.add_argument('--access-log', default=None, help="Write access log in nginx ui_short format to this file")
+    arg_pars.add_argument('--autoindex', action="store_true",
+                          help="List directories that have no index.html instead of answering 404")
+    arg_pars.add_argument('--shutdown-timeout', default=DEFAULT_SHUTDOWN_TIMEOUT, type=float,
+                          help="Seconds active connections get to finish on SIGTERM/SIGINT")
+    arg_pars.add_argument('--header-timeout', default=HEADER_TIMEOUT, type=float,
+                          help="Seconds to receive a whole request head, from accept or its first byte")
+    arg_pars.add_argument('--keep-alive-timeout', default=KEEP_ALIVE_TIMEOUT, type=float,
+                          help="Seconds an idle keep-alive connection is kept open")
+    arg_pars.add_argument('--write-timeout', default=WRITE_TIMEOUT, type=float,
+                          help="Seconds to send a whole response")
+    arg_pars.add_argument('--max-conn-per-ip', default=0, type=int,
+                          help="Asyncio backend: connections per client address and worker, 0 for no limit")
+    arg_pars.add_argument('--certfile', default=None, help="PEM certificate chain, enables HTTPS")
+    arg_pars.add_argument('--keyfile', default=None, help="PEM private key, if not in the certificate file")
+    arg_pars.add_argument('--handoff-socket', default=None,
+                          help="Unix socket path: take over the listening socket of the server running on it, "
+                               "then accept handoffs from the next one")
     args = arg_pars.parse_args()
+    if args.status_port and args.backend == "asyncio" and args.workers > 1:
+        # the status thread would run in the parent process, the forked workers' metrics never reach it
+        arg_pars.error("--status-port can't report asyncio worker processes, use --status-path or -w 1")
 
     logging.basicConfig(level=logging.DEBUG,
                         datefmt='%Y.%m.%d %H:%M:%S',
@@ -172,6 +1851,22 @@ if __name__ == "__main__":
                     server_name=args.server_name,
                     max_workers=args.workers,
                     document_root=args.document_root,
+                    backend=args.backend,
+                    backlog=args.backlog,
+                    max_pending=args.max_pending,
+                    overload=args.overload,
+                    status_path=args.status_path,
+                    status_port=args.status_port,
+                    access_log=args.access_log,
+                    autoindex=args.autoindex,
+                    shutdown_timeout=args.shutdown_timeout,
+                    handoff_socket=args.handoff_socket,
+                    certfile=args.certfile,
+                    keyfile=args.keyfile,
+                    header_timeout=args.header_timeout,
+                    keep_alive_timeout=args.keep_alive_timeout,
+                    write_timeout=args.write_timeout,
+                    max_connections_per_ip=args.max_conn_per_ip,
                     )
 
     server.run_server_forever()
@@ -0,0 +1,415 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from httpd import BACKENDS, Server
+
+DEFAULT_FILE_MIX = "1024:6,65536:3,1048576:1"
+PERCENTILES = [50, 90, 99, 99.9]
+HISTOGRAM_BUCKETS_MS = [0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+SERVER_START_TIMEOUT = 10
+REQUEST_TIMEOUT = 30
+TLS_MODES = ["off", "on", "both"]
+HANDSHAKE_PROBES = 50
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def parse_file_mix(file_mix: str) -> List[Tuple[int, int]]:
+    """Parses "size:weight,size:weight" into a list of (size in bytes, weight)"""
+    mix = []
+    for item in file_mix.split(","):
+        size, _, weight = item.partition(":")
+        mix.append((int(size), int(weight or 1)))
+    if not mix or any(size < 0 or weight <= 0 for size, weight in mix):
+        raise argparse.ArgumentTypeError(f"Invalid file mix: {file_mix}")
+    return mix
+
+
+def create_document_root(file_mix: List[Tuple[int, int]]) -> str:
+    document_root = tempfile.mkdtemp(prefix="otuserver-load-")
+    for size, _ in file_mix:
+        with open(os.path.join(document_root, f"file-{size}.bin"), "wb") as file:
+            file.write(os.urandom(size))
+    return document_root
+
+
+def generate_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """Creates a throwaway EC P-256 certificate for localhost with the openssl CLI"""
+    certfile, keyfile = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    command = ["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes",
+               "-keyout", keyfile, "-out", certfile, "-days", "1", "-subj", "/CN=localhost"]
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as error:
+        raise LoadTestError(f"Could not generate a self-signed certificate with openssl: {error}")
+    return certfile, keyfile
+
+
+def create_client_ssl_context() -> ssl.SSLContext:
+    # the certificate is self-signed, only the cost of TLS is measured here
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def find_free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def run_server(host, port, backend, workers, document_root, certfile=None, keyfile=None):
+    logging.basicConfig(level=logging.WARNING)
+    # own process group, so stop_server reaches the event loop worker processes too
+    os.setpgrp()
+    server = Server(host=host,
+                    port=port,
+                    server_name="OTUServer",
+                    max_workers=workers,
+                    document_root=document_root,
+                    backend=backend,
+                    certfile=certfile,
+                    keyfile=keyfile,
+                    )
+    server.run_server_forever()
+
+
+def start_server(host, port, backend, workers, document_root, certfile=None, keyfile=None) -> multiprocessing.Process:
+    process = multiprocessing.Process(target=run_server,
+                                      args=(host, port, backend, workers, document_root, certfile, keyfile))
+    process.start()
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    stop_server(process)
+    raise LoadTestError(f"Server did not start on {host}:{port}")
+
+
+def stop_server(process: multiprocessing.Process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    process.join()
+
+
+class Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+def probe_handshakes(host, port, ssl_context: ssl.SSLContext, count=HANDSHAKE_PROBES) -> Dict:
+    """Times sequential TLS handshakes, each one offering the session ticket of the previous connection"""
+    full, resumed = [], []
+    session = None
+    for _ in range(count):
+        started = time.perf_counter()
+        with socket.create_connection((host, port), timeout=REQUEST_TIMEOUT) as sock:
+            with ssl_context.wrap_socket(sock, session=session) as tls_sock:
+                elapsed = time.perf_counter() - started
+                (resumed if tls_sock.session_reused else full).append(elapsed * 1000)
+                version = tls_sock.version()
+                # TLS 1.3 tickets arrive after the handshake, a full exchange makes the session resumable
+                tls_sock.sendall(f"HEAD / HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+                while tls_sock.recv(4096):
+                    pass
+                session = tls_sock.session
+    return {"version": version, "full_ms": summarize_ms(full), "resumed_ms": summarize_ms(resumed)}
+
+
+def summarize_ms(values_ms: List[float]) -> Dict:
+    values_ms = sorted(values_ms)
+    return {
+        "count": len(values_ms),
+        "mean": round(sum(values_ms) / len(values_ms), 3) if values_ms else 0.0,
+        "p50": round(percentile(values_ms, 50), 3),
+        "p99": round(percentile(values_ms, 99), 3),
+    }
+
+
+class LoadGenerator:
+    def __init__(self, host, port, paths, keep_alive=True, ssl_context=None):
+        self.host = host
+        self.port = port
+        self.paths = paths
+        self.keep_alive = keep_alive
+        self.ssl_context = ssl_context
+        self.connect_times = []
+        self.latencies = []
+        self.status_codes = Counter()
+        self.errors = Counter()
+        self.bytes_received = 0
+        self._idle_connections = []
+
+    async def acquire(self) -> Connection:
+        if self._idle_connections:
+            return self._idle_connections.pop()
+        started = time.perf_counter()
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl_context)
+        # with TLS this includes the full handshake: the asyncio client can't offer a session for resumption
+        self.connect_times.append(time.perf_counter() - started)
+        return Connection(reader, writer)
+
+    def release(self, connection: Connection, reusable: bool):
+        if self.keep_alive and reusable:
+            self._idle_connections.append(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        for connection in self._idle_connections:
+            connection.close()
+        self._idle_connections = []
+
+    async def request(self, path: str, started: Optional[float] = None):
+        """Sends one GET request; latency counts from `started` so open-loop queueing delay is included"""
+        started = time.perf_counter() if started is None else started
+        connection = None
+        try:
+            connection = await self.acquire()
+            status, reusable = await asyncio.wait_for(self.exchange(connection, path), REQUEST_TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, LoadTestError) as error:
+            self.errors[type(error).__name__] += 1
+            if connection is not None:
+                connection.close()
+            return
+        self.release(connection, reusable)
+        self.latencies.append(time.perf_counter() - started)
+        self.status_codes[status] += 1
+
+    async def exchange(self, connection: Connection, path: str) -> Tuple[int, bool]:
+        connection_header = "keep-alive" if self.keep_alive else "close"
+        connection.writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                                f"Connection: {connection_header}\r\n\r\n".encode())
+        head = await connection.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            status = int(lines[0].split(" ")[1])
+        except (IndexError, ValueError):
+            raise LoadTestError(f"Malformed status line: {lines[0]}")
+
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        await connection.reader.readexactly(length)
+        self.bytes_received += len(head) + length
+        return status, headers.get("connection", "").lower() == "keep-alive"
+
+    def choose_path(self) -> str:
+        return random.choice(self.paths)
+
+    async def run_closed_loop(self, concurrency: int, requests: Optional[int], duration: Optional[float]):
+        """Each of `concurrency` clients sends its next request as soon as the previous one completes"""
+        deadline = time.perf_counter() + duration if duration else None
+        remaining = [requests]
+
+        async def client():
+            while True:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                if remaining[0] is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                await self.request(self.choose_path())
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    async def run_open_loop(self, rate: float, requests: Optional[int], duration: Optional[float],
+                            max_inflight: int):
+        """Requests are started on a fixed schedule regardless of how fast the server answers"""
+        total = requests if requests is not None else int(rate * duration)
+        tasks = set()
+        started = time.perf_counter()
+        for number in range(total):
+            scheduled = started + number / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(tasks) >= max_inflight:
+                self.errors["dropped"] += 1
+                continue
+            task = asyncio.ensure_future(self.request(self.choose_path(), started=scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def build_report(generator: LoadGenerator, elapsed: float, config: Dict) -> Dict:
+    latencies_ms = sorted(latency * 1000 for latency in generator.latencies)
+    completed = len(latencies_ms)
+
+    histogram = []
+    index = 0
+    for bound in HISTOGRAM_BUCKETS_MS:
+        while index < completed and latencies_ms[index] <= bound:
+            index += 1
+        histogram.append({"le_ms": bound, "count": index})
+    histogram.append({"le_ms": "+Inf", "count": completed})
+
+    return {
+        "config": config,
+        "duration_sec": round(elapsed, 3),
+        "completed_requests": completed,
+        "errors": dict(generator.errors),
+        "status_codes": {str(code): count for code, count in sorted(generator.status_codes.items())},
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "transfer_bytes_per_sec": round(generator.bytes_received / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "min": round(latencies_ms[0], 3) if latencies_ms else 0.0,
+            "mean": round(sum(latencies_ms) / completed, 3) if latencies_ms else 0.0,
+            **{f"p{p:g}": round(percentile(latencies_ms, p), 3) for p in PERCENTILES},
+            "max": round(latencies_ms[-1], 3) if latencies_ms else 0.0,
+        },
+        "connect_ms": summarize_ms([connect_time * 1000 for connect_time in generator.connect_times]),
+        "histogram": histogram,
+    }
+
+
+async def run_load(args, paths, ssl_context=None) -> Dict:
+    generator = LoadGenerator(args.host, args.port, paths, keep_alive=args.keep_alive, ssl_context=ssl_context)
+    started = time.perf_counter()
+    try:
+        if args.mode == "open":
+            await generator.run_open_loop(args.rate, args.requests, args.duration, args.max_inflight)
+        else:
+            await generator.run_closed_loop(args.concurrency, args.requests, args.duration)
+    finally:
+        generator.close()
+    elapsed = time.perf_counter() - started
+
+    config = {
+        "mode": args.mode,
+        "concurrency": args.concurrency if args.mode == "closed" else None,
+        "rate": args.rate if args.mode == "open" else None,
+        "keep_alive": args.keep_alive,
+        "tls": ssl_context is not None,
+        "backend": args.backend if args.spawn_server else None,
+        "workers": args.workers if args.spawn_server else None,
+        "paths": sorted(set(paths)),
+    }
+    return build_report(generator, elapsed, config)
+
+
+def parse_args(argv=None):
+    arg_pars = argparse.ArgumentParser(description="Load test and latency benchmark for OTUServer")
+    arg_pars.add_argument('--host', default="127.0.0.1")
+    arg_pars.add_argument('-p', '--port', type=int, default=None,
+                          help="Port of a running server. If omitted, a server is started on a free port")
+    arg_pars.add_argument('-b', '--backend', default="threads", choices=BACKENDS, help="Backend of the started server")
+    arg_pars.add_argument('-w', '--workers', default=4, type=int, help="Workers of the started server")
+    arg_pars.add_argument('-m', '--mode', default="closed", choices=["closed", "open"],
+                          help="closed: fixed concurrency; open: constant request rate")
+    arg_pars.add_argument('-c', '--concurrency', default=50, type=int)
+    arg_pars.add_argument('--rate', default=1000.0, type=float, help="Requests per second in open mode")
+    arg_pars.add_argument('--max-inflight', default=1000, type=int,
+                          help="Open mode: requests over this many in flight are dropped and counted as errors")
+    arg_pars.add_argument('-n', '--requests', default=None, type=int, help="Total requests to send")
+    arg_pars.add_argument('-d', '--duration', default=None, type=float, help="Test duration in seconds")
+    arg_pars.add_argument('-k', '--keep-alive', action=argparse.BooleanOptionalAction, default=True)
+    arg_pars.add_argument('--file-mix', default=DEFAULT_FILE_MIX, type=parse_file_mix,
+                          help="Comma separated size:weight pairs of generated files")
+    arg_pars.add_argument('--path', action="append", default=None,
+                          help="Request these paths instead of generated files (repeatable)")
+    arg_pars.add_argument('--tls', default="off", choices=TLS_MODES,
+                          help="Use HTTPS; both runs the test twice and reports TLS on and off side by side")
+    arg_pars.add_argument('-o', '--output', default=None, help="Write the JSON report to this file")
+    args = arg_pars.parse_args(argv)
+
+    if args.tls == "both" and args.port is not None:
+        arg_pars.error("--tls both needs a started server, a running one speaks either HTTP or HTTPS")
+    if args.requests is None and args.duration is None:
+        args.requests = 10000
+    args.spawn_server = args.port is None
+    return args
+
+
+def run_test(args, paths, tls: bool, document_root=None, cert=(None, None)) -> Dict:
+    ssl_context = create_client_ssl_context() if tls else None
+    server_process = None
+    if args.spawn_server:
+        args.port = find_free_port(args.host)
+        server_process = start_server(args.host, args.port, args.backend, args.workers, document_root,
+                                      *(cert if tls else (None, None)))
+    try:
+        handshake = probe_handshakes(args.host, args.port, ssl_context) if tls else None
+        report = asyncio.run(run_load(args, paths, ssl_context))
+    finally:
+        if server_process is not None:
+            stop_server(server_process)
+    if handshake is not None:
+        report["handshake"] = handshake
+    return report
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    document_root, cert_dir, cert = None, None, (None, None)
+    if args.spawn_server:
+        document_root = create_document_root(args.file_mix)
+        if args.tls != "off":
+            cert_dir = tempfile.mkdtemp(prefix="otuserver-cert-")
+            cert = generate_self_signed_cert(cert_dir)
+
+    if args.path:
+        paths = args.path
+    else:
+        paths = [f"/file-{size}.bin" for size, weight in args.file_mix for _ in range(weight)]
+
+    try:
+        if args.tls == "both":
+            report = {"tls_off": run_test(args, paths, False, document_root),
+                      "tls_on": run_test(args, paths, True, document_root, cert)}
+        else:
+            report = run_test(args, paths, args.tls == "on", document_root, cert)
+    finally:
+        for directory in (document_root, cert_dir):
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    result = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(result)
+    print(result)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
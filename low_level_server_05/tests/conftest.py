@@ -0,0 +1,36 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from low_level_server_05.httpd import RequestHandler
+
+WAIT_TIMEOUT = 5
+
+
+@pytest.fixture()
+def document_root(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    return root
+
+
+@pytest.fixture()
+def handler(document_root):
+    """A request handler with no connection, for the routing and response building code"""
+    server = SimpleNamespace(document_root=str(document_root), server_name="test", header_timeout=10)
+    handler = RequestHandler(server)
+    handler.reset_response()
+    return handler
+
+
+@pytest.fixture()
+def wait_until():
+    def wait(predicate, timeout=WAIT_TIMEOUT) -> bool:
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+    return wait
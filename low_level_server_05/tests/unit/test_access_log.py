@@ -0,0 +1,50 @@
+import time
+
+from log_analyzer_01.log_analyzer import LOGPAT
+from low_level_server_05.httpd import AccessLog, metrics
+
+HEADERS = {"user-agent": "curl/8.0", "referer": "http://example.com/", "x-request-id": "1498704044-1"}
+
+
+def format_line(request_line="GET /api/v2/banner/1 HTTP/1.1", headers=None) -> str:
+    return AccessLog.format("10.0.0.1", time.time(), request_line, 200, 1018,
+                            HEADERS if headers is None else headers, 0.151)
+
+
+def test_line_is_parsed_by_log_analyzer():
+    match = LOGPAT.search(format_line())
+    assert match is not None
+    fields = match.groupdict()
+    assert fields["ipaddress"] == "10.0.0.1"
+    assert fields["url"].strip() == "/api/v2/banner/1"
+    assert (fields["statuscode"], fields["bytessent"], fields["request_time"]) == ("200", "1018", "0.151")
+
+
+def test_line_without_optional_headers_is_parsed_by_log_analyzer():
+    fields = LOGPAT.search(format_line(headers={})).groupdict()
+    assert fields["refferer"] == "-"
+    assert fields["request_time"] == "0.151"
+
+
+def test_client_quotes_are_escaped():
+    line = format_line('GET /a"b HTTP/1.1', {"user-agent": 'evil" 500 0 "x'})
+    assert line.count('"') == 12
+    assert '/a\\x22b' in line and 'evil\\x22 500 0 \\x22x' in line
+    fields = LOGPAT.search(line).groupdict()
+    assert fields["url"].strip() == "/a\\x22b"
+    assert (fields["statuscode"], fields["request_time"]) == ("200", "0.151")
+
+
+def test_control_characters_and_backslashes_are_escaped():
+    line = format_line(headers={"user-agent": "a\\b\x1b[31m"})
+    assert '"a\\x5Cb\\x1B[31m"' in line
+    assert line.count("\n") == 1
+
+
+def test_records_over_the_queue_limit_are_dropped(tmp_path):
+    access_log = AccessLog(str(tmp_path / "access.log"), max_queue=2)
+    dropped = metrics.total("httpd_access_log_dropped_total")
+    for _ in range(5):
+        access_log.log(("10.0.0.1", time.time(), "GET / HTTP/1.1", 200, 0, {}, 0.0))
+    assert metrics.total("httpd_access_log_dropped_total") == dropped + 3
+    assert len(access_log._records) == 2
@@ -0,0 +1,28 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from low_level_server_05.httpd import MAX_HEADER_SIZE, AsyncConnectHandler
+
+
+def large_request(uri: str) -> bytes:
+    head = f"GET {uri} HTTP/1.1\r\nHost: test\r\nUser-Agent: {'a' * (MAX_HEADER_SIZE - 800)}\r\n\r\n"
+    return head.encode()
+
+
+def read_requests(data: bytes, count: int) -> list:
+    async def read():
+        reader = asyncio.StreamReader(limit=MAX_HEADER_SIZE)
+        reader.feed_data(data)
+        reader.feed_eof()
+        server = SimpleNamespace(document_root="/", server_name="test", header_timeout=10,
+                                 closing_idle=threading.Event())
+        handler = AsyncConnectHandler(reader, None, server)
+        return [await handler.read_request() for _ in range(count)]
+    return asyncio.run(read())
+
+
+def test_pipelined_requests_near_the_header_limit():
+    uris = ["/first", "/second", "/third"]
+    requests = read_requests(b"".join(large_request(uri) for uri in uris), len(uris))
+    assert [request.uri for request in requests] == uris
@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+HTTPD = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "httpd.py")
+
+
+def test_status_port_with_asyncio_worker_processes_is_rejected():
+    result = subprocess.run([sys.executable, HTTPD, "-b", "asyncio", "-w", "2", "--status-port", "9090"],
+                            capture_output=True, text=True, timeout=10)
+    assert result.returncode == 2
+    assert "--status-port" in result.stderr
@@ -0,0 +1,57 @@
+import os
+from email.utils import formatdate
+
+import pytest
+
+from low_level_server_05.httpd import HTTPStatus, RequestHandler
+
+ETAG = '"5f3e-3e8"'
+MTIME = 1700000000.5
+
+
+def is_not_modified(handler, headers: dict) -> bool:
+    handler.headers = headers
+    return handler.is_not_modified(ETAG, MTIME)
+
+
+@pytest.mark.parametrize("if_none_match", [ETAG, f"W/{ETAG}", f'"other", {ETAG}', f' "other" ,W/{ETAG} ', "*"])
+def test_matching_if_none_match_is_not_modified(handler, if_none_match):
+    assert is_not_modified(handler, {"if-none-match": if_none_match})
+
+
+@pytest.mark.parametrize("if_none_match", ['"other"', 'W/"other"', ETAG.strip('"'), '"5f3e-3e8-gzip"'])
+def test_other_if_none_match_is_modified(handler, if_none_match):
+    assert not is_not_modified(handler, {"if-none-match": if_none_match})
+
+
+@pytest.mark.parametrize("since, not_modified", [
+    (MTIME, True),
+    (MTIME + 60, True),
+    (MTIME - 60, False),
+])
+def test_if_modified_since(handler, since, not_modified):
+    assert is_not_modified(handler, {"if-modified-since": formatdate(since, usegmt=True)}) is not_modified
+
+
+def test_invalid_if_modified_since_is_modified(handler):
+    assert not is_not_modified(handler, {"if-modified-since": "yesterday"})
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(handler):
+    headers = {"if-none-match": '"other"', "if-modified-since": formatdate(MTIME + 60, usegmt=True)}
+    assert not is_not_modified(handler, headers)
+
+
+def test_without_validators_is_modified(handler):
+    assert not is_not_modified(handler, {})
+
+
+def test_not_modified_response_has_no_body(handler, document_root):
+    path = document_root / "data.bin"
+    path.write_bytes(bytes(100))
+    stat = os.stat(path)
+    handler.headers = {"if-none-match": RequestHandler.create_etag(stat)}
+    handler.serve_file(str(path), stat)
+    assert handler.response_status is HTTPStatus.NOT_MODIFIED
+    assert handler.response_file is None
+    assert handler.response_body == []
@@ -0,0 +1,64 @@
+import socket
+import subprocess
+import threading
+import time
+
+import pytest
+
+from low_level_server_05.httpd import DEADLINE_CHECK_INTERVAL, Server, metrics
+
+HEADER_TIMEOUT = 0.5
+
+
+@pytest.fixture()
+def tls_server(tmp_path):
+    certfile, keyfile = str(tmp_path / "cert.pem"), str(tmp_path / "key.pem")
+    try:
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+                        "-nodes", "-keyout", keyfile, "-out", certfile, "-days", "1", "-subj", "/CN=localhost"],
+                       check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as error:
+        pytest.skip(f"openssl is not available: {error}")
+    return Server("127.0.0.1", 0, "test", 1, str(tmp_path), certfile=certfile, keyfile=keyfile,
+                  header_timeout=HEADER_TIMEOUT)
+
+
+def accept(server, client_data: bytes) -> socket.socket:
+    """Simulates the accept loop for one connection whose client sends client_data and closes"""
+    server_sock, client_sock = socket.socketpair()
+    client_sock.sendall(client_data)
+    client_sock.close()
+    server_sock.settimeout(2)
+    server.slots.acquire()
+    server.accepted_connections += 1
+    return server_sock
+
+
+def test_failed_tls_handshake_is_not_left_in_flight(tls_server):
+    for _ in range(3):
+        tls_server.handle_connection(accept(tls_server, b"GET / HTTP/1.1\r\n\r\n"), time.monotonic())
+
+    stats = tls_server.stats()
+    assert stats["accepted_connections"] == 3
+    assert stats["in_flight_connections"] == 0
+    assert stats["queue_depth"] == 0
+
+
+def test_slow_tls_handshake_is_closed_at_header_deadline(tls_server):
+    server_sock, client_sock = socket.socketpair()
+    # a slowloris client: the start of a ClientHello, then nothing for longer than the header timeout
+    client_sock.sendall(b"\x16")
+    server_sock.settimeout(10)
+    tls_server.slots.acquire()
+    tls_server.accepted_connections += 1
+    reaper = threading.Thread(target=tls_server.run_deadline_reaper, daemon=True)
+    reaper.start()
+    closed_before = metrics.total("httpd_deadline_closed_total")
+
+    started = time.monotonic()
+    tls_server.handle_connection(server_sock, started)
+    client_sock.close()
+
+    assert time.monotonic() - started < HEADER_TIMEOUT + 2 * DEADLINE_CHECK_INTERVAL
+    assert metrics.total("httpd_deadline_closed_total") == closed_before + 1
+    assert not tls_server.handlers
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from low_level_server_05.httpd import LRUCache
+
+BODY = b"<html>" + b"a" * 1000 + b"</html>"
+
+
+@pytest.fixture(autouse=True)
+def page(document_root):
+    (document_root / "page.html").write_bytes(BODY)
+    return document_root / "page.html"
+
+
+def select_encoding(handler, accept_encoding: str):
+    path = os.path.join(handler.document_root, "page.html")
+    handler.headers = {"accept-encoding": accept_encoding}
+    return handler.select_encoding(path, os.stat(path), "text/html")
+
+
+@pytest.mark.parametrize("accept_encoding, accepted", [
+    ("gzip, br", {"gzip", "br"}),
+    ("GZip ,  BR", {"gzip", "br"}),
+    ("gzip;q=0, br;q=0.5", {"br"}),
+    ("gzip; q=0.0, br", {"br"}),
+    ("gzip;q=1.0", {"gzip"}),
+    ("gzip;q=bad, identity", {"identity"}),
+    ("", set()),
+])
+def test_parse_accept_encoding(handler, accept_encoding, accepted):
+    handler.headers = {"accept-encoding": accept_encoding}
+    assert handler.parse_accept_encoding() == accepted
+
+
+def test_refused_gzip_is_not_compressed(handler):
+    assert select_encoding(handler, "gzip;q=0")[0] is None
+
+
+def test_byte_bounded_cache_evicts_oldest_entries():
+    cache = LRUCache(100, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.get("a")
+    cache.set("c", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234" and cache.get("c") == b"1234"
+    assert cache.size_bytes == 8
+
+
+def test_byte_bounded_cache_skips_values_over_the_limit():
+    cache = LRUCache(100, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"1234"
+
+
+def test_byte_bounded_cache_replaces_an_entry_in_place():
+    cache = LRUCache(100, max_bytes=10)
+    cache.set("a", b"12345678")
+    cache.set("a", b"12")
+    assert cache.size_bytes == 2
+
+
+def touch(path, mtime: float):
+    os.utime(path, (mtime, mtime))
+
+
+def test_fresh_precompressed_sibling_is_served(handler, page):
+    sibling = page.with_name("page.html.gz")
+    sibling.write_bytes(b"gz")
+    touch(sibling, page.stat().st_mtime + 10)
+    encoding, path, stat, data = select_encoding(handler, "gzip")
+    assert (encoding, path, data) == ("gzip", str(sibling), None)
+    assert stat.st_size == 2
+
+
+def test_stale_precompressed_sibling_is_ignored(handler, page):
+    sibling = page.with_name("page.html.gz")
+    sibling.write_bytes(b"gz")
+    touch(sibling, page.stat().st_mtime - 10)
+    encoding, path, _, data = select_encoding(handler, "gzip")
+    assert (encoding, path) == ("gzip", str(page))
+    assert data is not None
+
+
+def test_brotli_sibling_is_preferred(handler, page):
+    for suffix in (".br", ".gz"):
+        sibling = page.with_name("page.html" + suffix)
+        sibling.write_bytes(b"x")
+        touch(sibling, page.stat().st_mtime + 10)
+    assert select_encoding(handler, "gzip, br")[0] == "br"
+    assert select_encoding(handler, "gzip")[0] == "gzip"
+
+
+def test_precompressed_sibling_symlinked_outside_root_is_ignored(handler, page, document_root):
+    outside = document_root.parent / "secret.gz"
+    outside.write_bytes(b"secret")
+    touch(outside, page.stat().st_mtime + 10)
+    page.with_name("page.html.gz").symlink_to(outside)
+    _, path, _, data = select_encoding(handler, "gzip")
+    assert path == str(page)
+    assert data is not None
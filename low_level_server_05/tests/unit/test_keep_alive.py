@@ -0,0 +1,96 @@
+import os
+import resource
+import socket
+import threading
+
+import pytest
+
+from low_level_server_05.httpd import Server
+
+REQUEST = b"GET /index.html HTTP/1.1\r\nHost: test\r\n\r\n"
+WAIT_TIMEOUT = 5
+# select.select only takes descriptors below FD_SETSIZE
+FD_SETSIZE = 1024
+
+
+@pytest.fixture()
+def pool_server(document_root):
+    """A thread pool server with one worker and no queue, every connection beyond it is answered with 503"""
+    (document_root / "index.html").write_bytes(b"hello")
+    listener = socket.create_server(("127.0.0.1", 0))
+    server = Server("127.0.0.1", 0, "test", 1, str(document_root), max_pending=0)
+    thread = threading.Thread(target=server.run_thread_pool, args=(listener,), daemon=True)
+    thread.start()
+    yield server, listener.getsockname()
+    server.stopping.set()
+    thread.join(WAIT_TIMEOUT)
+    listener.close()
+
+
+def get(sock: socket.socket) -> bytes:
+    sock.sendall(REQUEST)
+    response = b""
+    while not response.endswith(b"hello"):
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        response += chunk
+    return response
+
+
+def test_idle_keep_alive_connection_does_not_hold_the_worker(pool_server, wait_until):
+    server, address = pool_server
+    with socket.create_connection(address, timeout=WAIT_TIMEOUT) as first:
+        assert get(first).startswith(b"HTTP/1.1 200")
+        assert wait_until(lambda: server.stats()["idle_connections"] == 1)
+
+        with socket.create_connection(address, timeout=WAIT_TIMEOUT) as second:
+            assert get(second).startswith(b"HTTP/1.1 200")
+            assert wait_until(lambda: server.stats()["idle_connections"] == 2)
+            # the parked connection is handed back to the pool when its next request arrives
+            assert get(first).startswith(b"HTTP/1.1 200")
+            assert wait_until(lambda: server.stats()["idle_connections"] == 2)
+            assert server.stats()["in_flight_connections"] == 0
+            assert server.shed_connections == 0
+
+
+def test_parked_connection_is_closed_on_shutdown(pool_server, wait_until):
+    server, address = pool_server
+    with socket.create_connection(address, timeout=WAIT_TIMEOUT) as client:
+        assert get(client).startswith(b"HTTP/1.1 200")
+        assert wait_until(lambda: server.stats()["idle_connections"] == 1)
+
+        server.stopping.set()
+        assert client.recv(4096) == b""
+
+
+def test_resumed_connection_without_a_free_slot_is_shed(pool_server, wait_until):
+    server, address = pool_server
+    with socket.create_connection(address, timeout=WAIT_TIMEOUT) as parked:
+        assert get(parked).startswith(b"HTTP/1.1 200")
+        assert wait_until(lambda: server.stats()["idle_connections"] == 1)
+        # takes the only slot and keeps its worker waiting for the rest of the request
+        with socket.create_connection(address, timeout=WAIT_TIMEOUT) as busy:
+            busy.sendall(b"GET / HTTP/1.1\r\n")
+            assert wait_until(lambda: server.stats()["in_flight_connections"] == 1)
+
+            parked.sendall(REQUEST)
+            assert parked.recv(4096).startswith(b"HTTP/1.1 503")
+            assert server.shed_connections == 1
+
+@pytest.fixture()
+def high_fds():
+    """Holds enough descriptors open that new sockets get numbers above FD_SETSIZE"""
+    if resource.getrlimit(resource.RLIMIT_NOFILE)[0] < FD_SETSIZE + 100:
+        pytest.skip("the open file limit is too low")
+    fds = [os.open(os.devnull, os.O_RDONLY) for _ in range(FD_SETSIZE + 50)]
+    yield
+    for fd in fds:
+        os.close(fd)
+
+
+def test_keep_alive_on_descriptors_above_fd_setsize(high_fds, pool_server):
+    _, address = pool_server
+    with socket.create_connection(address, timeout=WAIT_TIMEOUT) as client:
+        assert client.fileno() > FD_SETSIZE
+        assert [get(client)[:12] for _ in range(3)] == [b"HTTP/1.1 200"] * 3
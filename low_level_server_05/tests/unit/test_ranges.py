@@ -0,0 +1,111 @@
+import os
+from email.utils import formatdate
+
+import pytest
+
+from low_level_server_05.httpd import MAX_RANGES, HTTPStatus, RequestHandler
+
+SIZE = 1000
+
+
+@pytest.fixture(autouse=True)
+def data_file(document_root):
+    (document_root / "data.bin").write_bytes(bytes(SIZE))
+
+
+def serve(handler, headers: dict):
+    path = os.path.join(handler.document_root, "data.bin")
+    handler.headers = headers
+    handler.serve_file(path, os.stat(path))
+    return handler
+
+
+def response_header(handler, name: str):
+    prefix = f"{name}: ".encode()
+    values = [line[len(prefix):].strip().decode() for line in handler.response_headers if line.startswith(prefix)]
+    return values[0] if values else None
+
+
+@pytest.mark.parametrize("header, ranges", [
+    ("bytes=0-99", [(0, 100)]),
+    ("bytes=900-", [(900, 100)]),
+    ("bytes=-100", [(900, 100)]),
+    ("bytes=-2000", [(0, SIZE)]),
+    ("bytes=990-2000", [(990, 10)]),
+    ("bytes=0-0, -1", [(0, 1), (999, 1)]),
+    ("BYTES = 10-19", [(10, 10)]),
+])
+def test_satisfiable_ranges(header, ranges):
+    assert RequestHandler.parse_ranges(header, SIZE) == ranges
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    assert RequestHandler.parse_ranges(header, SIZE) == []
+
+
+@pytest.mark.parametrize("header", ["items=0-9", "bytes=9-0", "bytes=-", "bytes=5", "bytes=a-b", "bytes=0-9,,"])
+def test_invalid_range_headers_are_ignored(header):
+    assert RequestHandler.parse_ranges(header, SIZE) is None
+
+
+def test_too_many_ranges_are_ignored():
+    allowed = ",".join(f"{i}-{i}" for i in range(MAX_RANGES))
+    assert len(RequestHandler.parse_ranges(f"bytes={allowed}", SIZE)) == MAX_RANGES
+    assert RequestHandler.parse_ranges(f"bytes={allowed},{MAX_RANGES}-{MAX_RANGES}", SIZE) is None
+
+
+def test_single_range_is_partial_content(handler):
+    serve(handler, {"range": "bytes=-100"})
+    assert handler.response_status is HTTPStatus.PARTIAL_CONTENT
+    assert response_header(handler, "Content-Range") == f"bytes 900-999/{SIZE}"
+    assert handler.response_body == [(900, 100)]
+
+
+def test_multiple_ranges_are_multipart(handler):
+    serve(handler, {"range": "bytes=0-9,500-"})
+    assert handler.response_status is HTTPStatus.PARTIAL_CONTENT
+    assert handler.content_type.startswith("multipart/byteranges; boundary=")
+    assert [part for part in handler.response_body if isinstance(part, tuple)] == [(0, 10), (500, 500)]
+    assert b"Content-Range: bytes 500-999/1000" in handler.response_body[2]
+
+
+def test_unsatisfiable_range_is_416(handler):
+    serve(handler, {"range": f"bytes={SIZE}-"})
+    assert handler.response_status is HTTPStatus.RANGE_NOT_SATISFIABLE
+    assert response_header(handler, "Content-Range") == f"bytes */{SIZE}"
+    assert handler.response_file is None
+    assert handler.content_length() == 0
+
+
+def test_ignored_range_serves_the_whole_file(handler):
+    serve(handler, {"range": "bytes=9-0"})
+    assert handler.response_status is HTTPStatus.OK
+    assert handler.response_body == [(0, SIZE)]
+
+
+def test_if_range_with_current_etag_applies_the_range(handler):
+    etag = response_header(serve(handler, {}), "ETag")
+    handler.reset_response()
+    serve(handler, {"range": "bytes=0-9", "if-range": etag})
+    assert handler.response_status is HTTPStatus.PARTIAL_CONTENT
+
+
+@pytest.mark.parametrize("if_range", ['"stale"', "Thu, 01 Jan 1970 00:00:00 GMT", "not a date"])
+def test_stale_if_range_serves_the_whole_file(handler, if_range):
+    serve(handler, {"range": "bytes=0-9", "if-range": if_range})
+    assert handler.response_status is HTTPStatus.OK
+    assert handler.response_body == [(0, SIZE)]
+
+
+def test_if_range_never_matches_a_weak_etag(handler):
+    etag = response_header(serve(handler, {}), "ETag")
+    handler.reset_response()
+    serve(handler, {"range": "bytes=0-9", "if-range": f"W/{etag}"})
+    assert handler.response_status is HTTPStatus.OK
+
+
+def test_if_range_with_last_modified_date_applies_the_range(handler):
+    mtime = os.stat(os.path.join(handler.document_root, "data.bin")).st_mtime
+    serve(handler, {"range": "bytes=0-9", "if-range": formatdate(mtime, usegmt=True)})
+    assert handler.response_status is HTTPStatus.PARTIAL_CONTENT
@@ -0,0 +1,116 @@
+import socket
+
+import pytest
+
+from low_level_server_05.httpd import HTTPError, HTTPStatus, RequestParser
+
+REQUEST = b"GET /a%20b.html?x=1 HTTP/1.1\r\nHost: test\r\nRange: bytes=0-9\r\nX-Unused: 1\r\n\r\n"
+
+
+def test_parses_request():
+    parser = RequestParser()
+    parser.feed(REQUEST)
+    request = parser.next_request()
+    assert (request.method, request.uri, request.http_ver) == ("GET", "/a b.html", "HTTP/1.1")
+    assert request.target == "/a%20b.html?x=1"
+    assert request.headers == {"host": "test", "range": "bytes=0-9"}
+    assert not parser.pending
+
+
+@pytest.mark.parametrize("split", [1, len(REQUEST) - 4, len(REQUEST) - 3, len(REQUEST) - 2, len(REQUEST) - 1])
+def test_terminator_split_across_reads(split):
+    parser = RequestParser()
+    parser.feed(REQUEST[:split])
+    assert parser.next_request() is None
+    parser.feed(REQUEST[split:])
+    assert parser.next_request().uri == "/a b.html"
+
+
+def test_byte_by_byte():
+    parser = RequestParser()
+    requests = []
+    for byte in REQUEST:
+        parser.feed(bytes([byte]))
+        requests.append(parser.next_request())
+    assert requests[:-1] == [None] * (len(REQUEST) - 1)
+    assert requests[-1].method == "GET"
+
+
+def test_pipelined_requests_are_kept_for_the_next_call():
+    parser = RequestParser()
+    parser.feed(REQUEST + b"HEAD /second HTTP/1.1\r\n\r\nGET /thi")
+    assert parser.next_request().method == "GET"
+    assert parser.pending
+    assert parser.next_request().uri == "/second"
+    assert parser.next_request() is None
+    assert parser.pending
+    parser.feed(b"rd HTTP/1.0\r\n\r\n")
+    request = parser.next_request()
+    assert (request.uri, request.http_ver) == ("/third", "HTTP/1.0")
+    assert not parser.pending
+
+
+def test_recv_into_reads_from_the_connection():
+    server_sock, client_sock = socket.socketpair()
+    with server_sock, client_sock:
+        client_sock.sendall(REQUEST)
+        parser = RequestParser()
+        assert parser.recv_into(server_sock) == len(REQUEST)
+        assert parser.next_request().method == "GET"
+
+
+@pytest.mark.parametrize("head", [
+    b"GET /\r\n\r\n",
+    b"GET / HTTP/1.1 extra\r\n\r\n",
+    b"G3T / HTTP/1.1\r\n\r\n",
+    b"GET / FTP/1.1\r\n\r\n",
+    b"GET / HTTP/1.1\r\nNo colon\r\n\r\n",
+    b"GET / HTTP/1.1\r\nHost : test\r\n\r\n",
+    b"GET / HTTP/1.1\r\n: empty\r\n\r\n",
+])
+def test_malformed_request_is_400(head):
+    parser = RequestParser()
+    parser.feed(head)
+    with pytest.raises(HTTPError) as error:
+        parser.next_request()
+    assert error.value.status is HTTPStatus.BAD_REQUEST
+
+
+def test_too_many_headers_is_431():
+    parser = RequestParser(max_headers=3)
+    parser.feed(b"GET / HTTP/1.1\r\n" + b"X-A: 1\r\n" * 4 + b"\r\n")
+    with pytest.raises(HTTPError) as error:
+        parser.next_request()
+    assert error.value.status is HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+
+def test_header_limit_is_inclusive():
+    parser = RequestParser(max_headers=3)
+    parser.feed(b"GET / HTTP/1.1\r\n" + b"X-A: 1\r\n" * 3 + b"\r\n")
+    assert parser.next_request() is not None
+
+
+def test_full_buffer_without_terminator_is_431():
+    parser = RequestParser(max_size=64)
+    parser.feed(b"GET /" + b"a" * 59)
+    with pytest.raises(HTTPError) as error:
+        parser.next_request()
+    assert error.value.status is HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+
+def test_feeding_past_the_buffer_is_431():
+    parser = RequestParser(max_size=64)
+    with pytest.raises(HTTPError) as error:
+        parser.feed(b"x" * 65)
+    assert error.value.status is HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+
+def test_recv_into_full_buffer_is_431():
+    server_sock, client_sock = socket.socketpair()
+    with server_sock, client_sock:
+        client_sock.sendall(b"x" * 64)
+        parser = RequestParser(max_size=64)
+        assert parser.recv_into(server_sock) == 64
+        with pytest.raises(HTTPError) as error:
+            parser.recv_into(server_sock)
+        assert error.value.status is HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
@@ -0,0 +1,36 @@
+import pytest
+
+from low_level_server_05.httpd import RequestParser
+
+
+@pytest.fixture(autouse=True)
+def files(document_root):
+    outside = document_root.parent
+    (document_root / "docs").mkdir()
+    (document_root / "index.html").write_text("root")
+    (document_root / "docs" / "page.html").write_text("page")
+    (outside / "index.html").write_text("parent")
+    (outside / "secret.txt").write_text("secret")
+    (document_root / "escape").symlink_to(outside)
+    (document_root / "evil").mkdir()
+    (document_root / "evil" / "index.html").symlink_to(outside / "secret.txt")
+
+
+@pytest.mark.parametrize("target", ["/..", "/%2e%2e", "/..?x", "/../", "/../secret.txt", "/docs/../../secret.txt",
+                                    "/%2e%2e/secret.txt", "/escape/secret.txt", "/escape/"])
+def test_paths_outside_document_root_are_not_found(handler, target):
+    path_info = handler.stat_path(RequestParser.parse_uri(target))
+    assert path_info.kind is None
+    assert path_info.stat is None
+
+
+@pytest.mark.parametrize("target, kind", [("/", "index"), ("/docs/page.html", "file"), ("/docs/", "dir"),
+                                          ("/docs/../index.html", "file"), ("/%64ocs/page.html", "file")])
+def test_paths_inside_document_root_are_served(handler, target, kind):
+    assert handler.stat_path(RequestParser.parse_uri(target)).kind == kind
+
+
+def test_index_file_symlinked_outside_document_root_is_not_served(handler):
+    path_info = handler.stat_path("/evil/")
+    assert path_info.kind == "dir"
+    assert not path_info.path.endswith("index.html")
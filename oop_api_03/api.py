@@ -3,9 +3,13 @@
 
 import datetime
 import hashlib
+import hmac
 import json
 import logging
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from optparse import OptionParser
@@ -14,9 +18,9 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 from dateutil.relativedelta import relativedelta
 
 if __name__ == "oop_api_03.api":
-    from oop_api_tests_04.scoring import get_interests, get_score
+    from oop_api_tests_04.scoring import get_batch, get_interests_many, get_score
 else:
-    from scoring import get_interests, get_score
+    from scoring import get_batch, get_interests_many, get_score
 
 SALT = "Otus"
 ADMIN_LOGIN = "admin"
@@ -36,19 +40,90 @@ CODE_CITY_PHONE = 7
 
 MAX_AGE = 70
 
+MAX_BATCH_SIZE = 1000
+
+AUTH_CACHE_SIZE = 10000
+
+SERIALIZER_PREFERENCE = ("orjson", "ujson", "json")
+
+MAX_WORKERS = 16
+MAX_PENDING = 64
+LISTEN_BACKLOG = 128
+
+
+class JSONSerializer:
+    """Standard library JSON, always available"""
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class UjsonSerializer(JSONSerializer):
+    name = "ujson"
+
+    def __init__(self) -> None:
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, value: Any) -> bytes:
+        return self._ujson.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._ujson.loads(data)
+
+
+class OrjsonSerializer(JSONSerializer):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, value: Any) -> bytes:
+        # clients_interests responses are keyed by int client ids
+        return self._orjson.dumps(value, option=self._orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._orjson.loads(data)
+
+
+SERIALIZERS = {serializer.name: serializer for serializer in (OrjsonSerializer, UjsonSerializer, JSONSerializer)}
+
+
+def load_serializer(name: Optional[str] = None) -> JSONSerializer:
+    """The requested serializer or the fastest installed one, falls back to the standard library"""
+    for serializer_name in (name,) if name else SERIALIZER_PREFERENCE:
+        try:
+            return SERIALIZERS[serializer_name]()
+        except ImportError:
+            logging.debug(f"{serializer_name} is not installed")
+    return JSONSerializer()
+
 
 class BaseField:
     def __init__(self, required: bool, nullable: bool) -> None:
         self.required = required
         self.nullable = nullable
+        # own _check of every class in the MRO, bound once, so validation is a flat loop without super() hops
+        self.validators = tuple(cls.__dict__["_check"].__get__(self)
+                                for cls in reversed(type(self).__mro__) if "_check" in cls.__dict__)
 
     def __get__(self, instance, owner):
-        return instance.__dict__[self.name]
+        if instance is None:
+            return self
+        return self.slot.__get__(instance, owner)
 
     def __set_name__(self, owner, name: str):
         self.name = name
+        # values live in a slot generated by RequestMeta, the field itself keeps only the slot descriptor
+        self.slot_name = f"_{name}"
+        self.slot = None
 
-    def _check_field(self, value: Any) -> None:
+    def _check(self, value: Any) -> None:
         if value is None and self.required:
             raise ValueError(f"Field {self.name} is required")
 
@@ -56,16 +131,16 @@ class BaseField:
             raise ValueError(f"Field {self.name} is not nullable but empty value found")
 
     def _validate(self, value: Any) -> None:
-        self._check_field(value)
+        for validator in self.validators:
+            validator(value)
 
     def __set__(self, instance: Any, value: Any) -> None:
         self._validate(value)
-        instance.__dict__[self.name] = value
+        self.slot.__set__(instance, value)
 
 
 class CharField(BaseField):
-    def _validate(self, value: str) -> None:
-        super()._validate(value)
+    def _check(self, value: str) -> None:
         if value is not None and not isinstance(value, str):
             raise ValueError(f"{self.__class__.__name__} invalid value type: {type(value)}")
 
@@ -76,65 +151,55 @@ class CharField(BaseField):
 
 
 class ArgumentsField(BaseField):
-    def _validate(self, value: Dict[str, Union[int, str]]) -> None:
-        import sys
-        print(sys.path)
-
-        print(1111111111, sys.path)
-        super()._validate(value)
-        try:
-            if not isinstance(value, dict):
-                raise ValueError(f"{self.__class__.__name__} invalid value type, can be dict")
-            json.dumps(value)
-        except TypeError:
-            raise ValueError(f"{self.__class__.__name__} invalid json format")
+    def _check(self, value: Dict[str, Union[int, str]]) -> None:
+        # the body comes from json.loads, so a dict here is always serializable
+        if not isinstance(value, dict):
+            raise ValueError(f"{self.__class__.__name__} invalid value type, can be dict")
 
 
 class EmailField(CharField):
-    def _validate(self, value: str) -> None:
-        super()._validate(value)
+    def _check(self, value: str) -> None:
         if value and "@" not in value:
             raise ValueError(f"Email must include '@': {value}")
 
 
 class PhoneField(BaseField):
-    def _validate(self, value: Union[int, str]) -> None:
-        super()._validate(value)
+    def _check(self, value: Union[int, str]) -> None:
         if value is not None:
             if not isinstance(value, (int, str)):
                 raise ValueError(f"Phone number must be int or str, not {type(value)}")
 
-            if len(str(value)) != PHONE_LENGTH:
-                raise ValueError(f"Invalid number length len{(str(value))}. "
+            phone = str(value)
+            if len(phone) != PHONE_LENGTH:
+                raise ValueError(f"Invalid number length len{phone}. "
                                  f"Expected length {PHONE_LENGTH}")
 
-            if not str(value).startswith(str(CODE_CITY_PHONE)):
+            if not phone.startswith(str(CODE_CITY_PHONE)):
                 raise ValueError(f"Invalid code city number {value}. "
                                  f"Expected code {CODE_CITY_PHONE}")
 
 
 class DateField(BaseField):
-    def _validate(self, value: str) -> None:
-        super()._validate(value)
+    def _check(self, value: str) -> None:
         if value is not None:
             datetime.datetime.strptime(value, "%d.%m.%Y")
 
 
 class BirthDayField(BaseField):
-    def _validate(self, value: str) -> None:
-        super()._validate(value)
+    def _check(self, value: str) -> None:
         if value:
             if not isinstance(value, str):
                 raise ValueError(f"Invalid type to date. Date cannot be {type(value)} or empty")
-            elif datetime.datetime.strptime(value, "%d.%m.%Y") < datetime.datetime.now() - relativedelta(years=MAX_AGE):
+            birthday = datetime.datetime.strptime(value, "%d.%m.%Y")
+            now = datetime.datetime.now()
+            if birthday < now - relativedelta(years=MAX_AGE):
                 raise ValueError(f"Invalid date of birth. Date cannot be more than {MAX_AGE} years")
-            elif datetime.datetime.strptime(value, "%d.%m.%Y") > datetime.datetime.now():
+            elif birthday > now:
                 raise ValueError(f"Invalid date of birth. Date cannot be in future {type(value)}")
 
 
 class GenderField(BaseField):
-    def _validate(self, value: int) -> None:
-        super()._validate(value)
+    def _check(self, value: int) -> None:
         if value is not None and value not in GENDERS:
             raise ValueError(f"Value can be is one {GENDERS}")
 
@@ -143,8 +208,7 @@ class ClientIDsField(BaseField):
     def __init__(self, required: bool, nullable: bool = False) -> None:
         super().__init__(required, nullable)
 
-    def _validate(self, value: Optional[List[int]]) -> None:
-        super()._validate(value)
+    def _check(self, value: Optional[List[int]]) -> None:
         if not value or not isinstance(value, (list, tuple)):
             raise ValueError(f"Invalid format value: {value} {self.__class__.__name__} "
                              f"can be not empty list or tuple")
@@ -154,6 +218,19 @@ class ClientIDsField(BaseField):
                 raise ValueError(f"Invalid type ClientID {type(id)}. Expected type int")
 
 
+class BatchItemsField(BaseField):
+    def _check(self, value: Optional[List[Dict]]) -> None:
+        if not value or not isinstance(value, list):
+            raise ValueError(f"Invalid format value: {value} {self.__class__.__name__} can be not empty list")
+
+        if len(value) > MAX_BATCH_SIZE:
+            raise ValueError(f"Too many requests in batch {len(value)}. Expected at most {MAX_BATCH_SIZE}")
+
+        for item in value:
+            if not isinstance(item, dict):
+                raise ValueError(f"Invalid type batch item {type(item)}. Expected type dict")
+
+
 class RequestMeta(type):
     def __new__(mcs, name, bases, attrs):
         fields = []
@@ -163,21 +240,34 @@ class RequestMeta(type):
                 fields.append((attr_name, attr_value))
 
         attrs["fields"] = fields
-        return super().__new__(mcs, name, bases, attrs)
+        # field values go to slots instead of a per-instance __dict__
+        attrs.setdefault("__slots__", tuple(f"_{attr_name}" for attr_name, _ in fields))
+        cls = super().__new__(mcs, name, bases, attrs)
+        for _, field_ in fields:
+            field_.slot = cls.__dict__[field_.slot_name]
+        # compiled once per class: (field name, flat validators, slot setter) walked by BaseRequest._validate_field
+        cls.validation_plan = tuple((field_name, field_.validators, field_.slot.__set__) for field_name, field_ in fields)
+        return cls
 
 
 class BaseRequest(metaclass=RequestMeta):
+    __slots__ = ("request_body",)
+
     def __init__(self, request_body: Dict[str, Union[List[int], Optional[str]]]):
         self.request_body = request_body
 
     def _validate_field(self) -> Dict[str, str]:
         validation_errors = dict()
-        for field_name, field_ in self.fields:
+        request_body = self.request_body
+        for field_name, validators, set_value in self.validation_plan:
+            field_request_value = request_body.get(field_name)
             try:
-                field_request_value = self.request_body.get(field_name)
-                setattr(self, field_name, field_request_value)
+                for validator in validators:
+                    validator(field_request_value)
             except Exception as exc:
                 validation_errors[field_name] = str(exc)
+            else:
+                set_value(self, field_request_value)
         return validation_errors
 
     def is_valid(self) -> tuple[bool, None] | tuple[bool, dict[str, str]]:
@@ -212,6 +302,15 @@ class OnlineScoreRequest(BaseRequest):
         return False, validation_errors
 
 
+class BatchRequest(BaseRequest):
+    requests = BatchItemsField(required=True, nullable=False)
+
+
+class BatchItemRequest(BaseRequest):
+    method = CharField(required=True, nullable=False)
+    arguments = ArgumentsField(required=True, nullable=True)
+
+
 class MethodRequest(BaseRequest):
     account = CharField(required=False, nullable=True)
     login = CharField(required=True, nullable=True)
@@ -224,13 +323,49 @@ class MethodRequest(BaseRequest):
         return self.login == ADMIN_LOGIN
 
 
+class AuthCache:
+    """Bounded LRU of successful token verifications, each valid for the period it was verified in"""
+
+    def __init__(self, max_size: int = AUTH_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: Tuple, period: str) -> bool:
+        with self._lock:
+            if self._entries.get(key) != period:
+                return False
+            self._entries.move_to_end(key)
+            return True
+
+    def add(self, key: Tuple, period: str) -> None:
+        with self._lock:
+            self._entries[key] = period
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+auth_cache = AuthCache()
+
+
 def check_auth(request: MethodRequest):
+    key = (request.account, request.login, request.token)
+    # admin tokens change every hour, so admin entries are only valid within the hour they were verified in
+    period = datetime.datetime.now().strftime("%Y%m%d%H") if request.is_admin else ""
+    if auth_cache.check(key, period):
+        return True
+
     if request.is_admin:
-        digest = hashlib.sha512(
-            (datetime.datetime.now().strftime("%Y%m%d%H") + ADMIN_SALT).encode("utf-8")).hexdigest()
+        digest = hashlib.sha512((period + ADMIN_SALT).encode("utf-8")).hexdigest()
     else:
         digest = hashlib.sha512((request.account + request.login + SALT).encode("utf-8")).hexdigest()
-    if digest == request.token:
+    if hmac.compare_digest(digest.encode("utf-8"), (request.token or "").encode("utf-8")):
+        auth_cache.add(key, period)
         return True
     return False
 
@@ -241,8 +376,7 @@ def handle_interests_request(method_request: MethodRequest, store, context) -> t
     if not request_is_valid:
         return errors, HTTPStatus.UNPROCESSABLE_ENTITY
 
-    response = {client_id: get_interests(store=store, cid=client_id)
-                for client_id in client_interests_request.client_ids}
+    response = get_interests_many(store=store, cids=client_interests_request.client_ids)
 
     context["nclients"] = len(client_interests_request.client_ids)
     return response, HTTPStatus.OK
@@ -266,11 +400,73 @@ def handle_score_request(method_request: MethodRequest, store, context) -> Tuple
 
     response = {"score": score}
     context["has"] = [field_val[0] for field_val in online_score_request.fields
-                      if online_score_request.__dict__.get(field_val[0]) is not None]
+                      if getattr(online_score_request, field_val[0], None) is not None]
 
     return response, HTTPStatus.OK
 
 
+BATCH_METHODS = {
+    "online_score": OnlineScoreRequest,
+    "clients_interests": ClientsInterestsRequest,
+}
+
+
+def batch_item_response(response: Any, code: int) -> Dict[str, Any]:
+    if code == HTTPStatus.OK:
+        return {"response": response, "code": code}
+    return {"error": response, "code": code}
+
+
+def handle_batch_request(method_request: MethodRequest, store, context) -> Tuple[Union[Dict, List], Any]:
+    batch_request = BatchRequest(request_body=method_request.arguments)
+    request_is_valid, errors = batch_request.is_valid()
+    if not request_is_valid:
+        return errors, HTTPStatus.UNPROCESSABLE_ENTITY
+
+    responses = [None] * len(batch_request.requests)
+    score_indexes, score_arguments = [], []
+    interests_indexes, interests_cids = [], []
+    for index, item in enumerate(batch_request.requests):
+        item_request = BatchItemRequest(request_body=item)
+        item_is_valid, item_errors = item_request.is_valid()
+        if not item_is_valid:
+            responses[index] = batch_item_response(item_errors, HTTPStatus.UNPROCESSABLE_ENTITY)
+            continue
+
+        request_class = BATCH_METHODS.get(item_request.method)
+        if request_class is None:
+            responses[index] = batch_item_response("Unknown method", HTTPStatus.UNPROCESSABLE_ENTITY)
+            continue
+
+        arguments_request = request_class(request_body=item_request.arguments)
+        item_is_valid, item_errors = arguments_request.is_valid()
+        if not item_is_valid:
+            responses[index] = batch_item_response(item_errors, HTTPStatus.UNPROCESSABLE_ENTITY)
+        elif request_class is ClientsInterestsRequest:
+            interests_indexes.append(index)
+            interests_cids.append(arguments_request.client_ids)
+        elif method_request.is_admin:
+            responses[index] = batch_item_response({"score": 42}, HTTPStatus.OK)
+        else:
+            score_indexes.append(index)
+            score_arguments.append({field_name: getattr(arguments_request, field_name, None)
+                                    for field_name, _ in arguments_request.fields})
+
+    # every store key of the batch is fetched in one round-trip
+    scores, interests = get_batch(store=store, score_requests=score_arguments, interests_requests=interests_cids)
+    for index, score in zip(score_indexes, scores):
+        responses[index] = batch_item_response({"score": score}, HTTPStatus.OK)
+    for position, index in enumerate(interests_indexes):
+        if interests is None:
+            responses[index] = batch_item_response(HTTPStatus.INTERNAL_SERVER_ERROR.phrase,
+                                                   HTTPStatus.INTERNAL_SERVER_ERROR)
+        else:
+            responses[index] = batch_item_response(interests[position], HTTPStatus.OK)
+
+    context["nrequests"] = len(responses)
+    return responses, HTTPStatus.OK
+
+
 def handle_request_method(method_request: MethodRequest, store, context) -> Tuple[Union[Dict, str], Any]:
     if method_request.method == "clients_interests":
         return handle_interests_request(
@@ -282,12 +478,16 @@ def handle_request_method(method_request: MethodRequest, store, context) -> Tupl
             method_request=method_request,
             store=store,
             context=context)
+    elif method_request.method == "batch":
+        return handle_batch_request(
+            method_request=method_request,
+            store=store,
+            context=context)
     else:
         return "Unknown method", HTTPStatus.UNPROCESSABLE_ENTITY
 
 
 def method_handler(request: Dict[str, Union[int, Any]], ctx, store):
-    print(request, ctx, store)
     method_request = MethodRequest(request_body=request["body"])
 
     request_method_is_valid, request_method_errors = method_request.is_valid()
@@ -302,22 +502,19 @@ def method_handler(request: Dict[str, Union[int, Any]], ctx, store):
         context=ctx,
         store=store
     )
-    print(response, code)
     return response, code
 
 
 class HTTPHandler(BaseHTTPRequestHandler):
     router = {"method": method_handler}
     store = None
+    serializer = load_serializer()
 
     @staticmethod
     def get_request_id(headers):
         return headers.get('HTTP_X_REQUEST_ID', uuid.uuid4().hex)
 
     def send_response_POST(self, code, response, context):
-        self.send_response(code)
-        self.send_header("Content-Type", "application/json")
-        self.end_headers()
         if code is HTTPStatus.OK:
             response = {"response": response, "code": code}
         else:
@@ -329,7 +526,12 @@ class HTTPHandler(BaseHTTPRequestHandler):
 
         context.update(response)
         logging.info(context)
-        self.wfile.write(json.dumps(response))
+        body = self.serializer.dumps(response)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
         return
 
     def do_POST(self):
@@ -339,7 +541,7 @@ class HTTPHandler(BaseHTTPRequestHandler):
 
         try:
             data_string = self.rfile.read(int(self.headers['Content-Length']))
-            request = json.loads(data_string)
+            request = self.serializer.loads(data_string)
             if request:
                 path = self.path.strip("/")
                 logging.info(f'{self.path}, {data_string}, {context["request_id"]}')
@@ -354,10 +556,41 @@ class HTTPHandler(BaseHTTPRequestHandler):
         self.send_response_POST(code, response, context)
 
 
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that handles requests on a bounded thread pool instead of one at a time"""
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, server_address, handler_class, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api-worker")
+        # at most max_workers running and max_pending queued requests, then accepting pauses
+        # and new connections wait in the listen backlog
+        self.slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
 if __name__ == "__main__":
     op = OptionParser()
     op.add_option("-p", "--port", action="store", type=int, default=8080)
     op.add_option("-l", "--log", action="store", default=None)
+    op.add_option("-w", "--workers", action="store", type=int, default=MAX_WORKERS)
+    op.add_option("-j", "--json", action="store", choices=list(SERIALIZERS), default=None)
     opts, args = op.parse_args()
     logging.basicConfig(
         filename=opts.log,
@@ -365,8 +598,9 @@ if __name__ == "__main__":
         format='[%(asctime)s] %(levelname).1s %(message)s',
         datefmt='%Y.%m.%d %H:%M:%S')
 
-    server = HTTPServer(("localhost", opts.port), HTTPHandler)
-    logging.info(f"Starting server at {opts.port}")
+    HTTPHandler.serializer = load_serializer(opts.json)
+    server = PooledHTTPServer(("localhost", opts.port), HTTPHandler, max_workers=opts.workers)
+    logging.info(f"Starting server at {opts.port} with {opts.workers} workers, {HTTPHandler.serializer.name} json")
 
     try:
         server.serve_forever()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Micro benchmarks for the scoring API hot path, run from the repository root: python -m oop_api_03.benchmark"""
+
+import gc
+import hashlib
+import json
+import sys
+import timeit
+import tracemalloc
+from optparse import OptionParser
+
+from oop_api_03.api import (SALT, SERIALIZERS, ClientsInterestsRequest, MethodRequest, OnlineScoreRequest,
+                            check_auth)
+
+METHOD_BODY = {"account": "horns&hoofs", "login": "h&f", "method": "online_score",
+               "token": hashlib.sha512(("horns&hoofs" + "h&f" + SALT).encode("utf-8")).hexdigest(),
+               "arguments": {"phone": "79175002040", "email": "stupnikov@otus.ru"}}
+SCORE_BODY = {"phone": "79175002040", "email": "stupnikov@otus.ru", "first_name": "Стансилав",
+              "last_name": "Ступников", "birthday": "01.01.1990", "gender": 1}
+INTERESTS_BODY = {"client_ids": [1, 2, 3, 4], "date": "20.07.2017"}
+SCORE_RESPONSE = {"response": {"score": 5.0}, "code": 200}
+BATCH_RESPONSE = {"response": [{"response": {"score": 3.0}, "code": 200}] * 50 +
+                              [{"response": {cid: ["cars", "pets"] for cid in range(4)}, "code": 200}] * 50,
+                  "code": 200}
+
+
+def validation_cases():
+    return {
+        "method": lambda: MethodRequest(request_body=METHOD_BODY).is_valid(),
+        "online_score": lambda: OnlineScoreRequest(request_body=SCORE_BODY).is_valid(),
+        "clients_interests": lambda: ClientsInterestsRequest(request_body=INTERESTS_BODY).is_valid(),
+    }
+
+
+def auth_cases():
+    request = MethodRequest(request_body=METHOD_BODY)
+    request.is_valid()
+    return {"check_auth": lambda: check_auth(request)}
+
+
+def serialization_cases():
+    cases = {}
+    request_data = json.dumps(METHOD_BODY).encode("utf-8")
+    for name, serializer_class in SERIALIZERS.items():
+        try:
+            serializer = serializer_class()
+        except ImportError:
+            continue
+        cases[f"{name}_loads_request"] = lambda serializer=serializer: serializer.loads(request_data)
+        cases[f"{name}_dumps_score"] = lambda serializer=serializer: serializer.dumps(SCORE_RESPONSE)
+        cases[f"{name}_dumps_batch"] = lambda serializer=serializer: serializer.dumps(BATCH_RESPONSE)
+    return cases
+
+
+def retained_memory(request_class, request_body, count):
+    """Bytes and allocated blocks per validated request object kept alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    requests = []
+    for _ in range(count):
+        request = request_class(request_body=request_body)
+        request.is_valid()
+        requests.append(request)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in stats) - sys.getsizeof(requests)
+    blocks = sum(stat.count_diff for stat in stats) - 1
+    return {"bytes": round(size / count, 1), "blocks": round(blocks / count, 2)}
+
+
+def memory_cases(count):
+    return {
+        "method": retained_memory(MethodRequest, METHOD_BODY, count),
+        "online_score": retained_memory(OnlineScoreRequest, SCORE_BODY, count),
+        "clients_interests": retained_memory(ClientsInterestsRequest, INTERESTS_BODY, count),
+    }
+
+
+def run(cases, number, repeat):
+    report = {}
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=number, repeat=repeat))
+        report[name] = {"per_sec": round(number / best), "usec": round(best / number * 1e6, 2)}
+    return report
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("-n", "--number", action="store", type=int, default=20000)
+    op.add_option("-r", "--repeat", action="store", type=int, default=5)
+    opts, args = op.parse_args()
+    print(json.dumps({"validation": run(validation_cases(), opts.number, opts.repeat),
+                      "auth": run(auth_cases(), opts.number, opts.repeat),
+                      "serialization": run(serialization_cases(), opts.number // 10, opts.repeat),
+                      "memory": memory_cases(opts.number)}, indent=2))
@@ -17,3 +17,13 @@ def get_score(store, phone, email, birthday=None, gender=None, first_name=None,
 def get_interests(store, cid):
     interests = ["cars", "pets", "travel", "hi-tech", "sport", "music", "books", "tv", "cinema", "geek", "otus"]
     return random.sample(interests, 2)
+
+
+def get_interests_many(store, cids):
+    return {cid: get_interests(store, cid) for cid in cids}
+
+
+def get_batch(store, score_requests, interests_requests):
+    scores = [get_score(store, **arguments) for arguments in score_requests]
+    interests = [get_interests_many(store, cids) for cids in interests_requests]
+    return scores, interests
@@ -1,10 +1,23 @@
 import datetime
 import hashlib
 import json
-from typing import List, Optional, Union
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from redis.exceptions import ConnectionError, TimeoutError
+
+from oop_api_tests_04.cache import LocalCache, SingleFlight
 from oop_api_tests_04.store import KeyValueStorage
 
+# cache expire 60 minutes
+SCORE_EXPIRE_TIME = 60 * 60
+
+# first tier in front of the store: repeated identities are answered from process memory,
+# which also keeps them served while Redis is unavailable
+score_cache = LocalCache(ttl=SCORE_EXPIRE_TIME)
+# concurrent misses for the same identity share one store lookup instead of all hitting Redis
+score_flight = SingleFlight()
+
 
 def get_score(store: KeyValueStorage,
               phone: Optional[Union[str, int]],
@@ -14,16 +27,33 @@ def get_score(store: KeyValueStorage,
               first_name: Optional[str] = None,
               last_name: Optional[str] = None) -> Union[int, float]:
 
+    key = score_key(phone=phone, birthday=birthday, first_name=first_name, last_name=last_name)
+    score = score_cache.get(key)
+    if score is not None:
+        return score
+
+    return score_flight.do(key, lambda: _load_score(store, key, phone, email, birthday, gender, first_name, last_name))
+
+
+def score_key(phone: Optional[Union[str, int]],
+              birthday: Optional[datetime.date] = None,
+              first_name: Optional[str] = None,
+              last_name: Optional[str] = None) -> str:
     key_parts = [first_name or "",
                  last_name or "",
                  str(phone) or "",
                  birthday if birthday is not None else "", ]
 
-    key = "uid:" + hashlib.md5("".join(key_parts).encode()).hexdigest()
-    score = store.cache_get(key) or 0
+    return "uid:" + hashlib.md5("".join(key_parts).encode()).hexdigest()
 
-    if score:
-        return score
+
+def compute_score(phone: Optional[Union[str, int]],
+                  email: Optional[str],
+                  birthday: Optional[datetime.date] = None,
+                  gender: Optional[int] = None,
+                  first_name: Optional[str] = None,
+                  last_name: Optional[str] = None) -> Union[int, float]:
+    score = 0
     if phone:
         score += 1.5
     if email:
@@ -32,11 +62,77 @@ def get_score(store: KeyValueStorage,
         score += 1.5
     if first_name and last_name:
         score += 0.5
-    # cache expire 60 minutes
-    store.cache_set(key, score, expire_time=60 * 60)
+    return score
+
+
+def _load_score(store: KeyValueStorage,
+                key: str,
+                phone: Optional[Union[str, int]],
+                email: Optional[str],
+                birthday: Optional[datetime.date],
+                gender: Optional[int],
+                first_name: Optional[str],
+                last_name: Optional[str]) -> Union[int, float]:
+    score, ttl = store.cache_get_with_ttl(key)
+    if score:
+        # the local copy must not outlive the Redis entry it was read from
+        score_cache.set(key, score, ttl=ttl)
+        return score
+    score = compute_score(phone, email, birthday, gender, first_name, last_name)
+    store.cache_set(key, score, expire_time=SCORE_EXPIRE_TIME)
+    score_cache.set(key, score)
     return score
 
 
 def get_interests(store: KeyValueStorage, cid: int) -> List[str]:
     r = store.get(f"i:{cid}")
     return json.loads(r) if r else []
+
+
+def get_interests_many(store: KeyValueStorage, cids: List[int]) -> Dict[int, List[str]]:
+    values = store.get_many([f"i:{cid}" for cid in cids])
+    # each value decoded on its own, a malformed one can't shift the interests of the ids after it
+    return {cid: json.loads(value) if value else [] for cid, value in zip(cids, values)}
+
+
+def get_batch(store: KeyValueStorage,
+              score_requests: List[Dict[str, Any]],
+              interests_requests: List[List[int]]) -> Tuple[List[Union[int, float]], Optional[List[Dict[int, List[str]]]]]:
+    """Scores and interests for a whole batch with one pipelined MGET for every key not found in the local cache.
+
+    Interests are None when the store is unavailable, scores are computed anyway.
+    """
+    score_keys = [score_key(phone=arguments.get("phone"),
+                            birthday=arguments.get("birthday"),
+                            first_name=arguments.get("first_name"),
+                            last_name=arguments.get("last_name")) for arguments in score_requests]
+    scores = [score_cache.get(key) for key in score_keys]
+    missing_keys = list(dict.fromkeys(key for key, score in zip(score_keys, scores) if score is None))
+    interest_keys = list(dict.fromkeys(f"i:{cid}" for cids in interests_requests for cid in cids))
+
+    try:
+        values, ttls = store.get_many_with_ttl(missing_keys + interest_keys, missing_keys)
+        values = dict(zip(missing_keys + interest_keys, values))
+        ttls = dict(zip(missing_keys, ttls))
+    except (ConnectionError, TimeoutError) as error:
+        logging.error(f"Error get batch from store. Error: {error}")
+        values = None
+
+    computed = {}
+    for index, (key, arguments) in enumerate(zip(score_keys, score_requests)):
+        if scores[index] is not None:
+            continue
+        cached = values.get(key) if values is not None else None
+        if cached:
+            scores[index] = float(cached)
+            score_cache.set(key, scores[index], ttl=ttls[key])
+        else:
+            scores[index] = computed[key] = compute_score(**arguments)
+            score_cache.set(key, scores[index])
+    if computed:
+        store.cache_set_many(computed, expire_time=SCORE_EXPIRE_TIME)
+
+    if values is None:
+        return scores, None
+    interests = [{cid: json.loads(values[f"i:{cid}"] or "[]") for cid in cids} for cids in interests_requests]
+    return scores, interests
@@ -1,55 +1,110 @@
 import logging
 from functools import wraps
-from typing import Callable, NoReturn, Optional, Union
+from typing import Callable, Dict, List, NoReturn, Optional, Tuple, Union
 
+from redis import BlockingConnectionPool
 from redis.client import Redis
 from redis.exceptions import ConnectionError, TimeoutError
 
+MAX_CONNECTIONS = 32
+POOL_TIMEOUT = 1
+HEALTH_CHECK_INTERVAL = 30
+PREWARM_CONNECTIONS = 4
+
 
 def make_retries(method: Callable) -> Callable:
     @wraps(method)
     def wrapper(self, *method_args, **method_kwargs):
-        result = None
-        try:
-            result = method(self, *method_args, **method_kwargs)
-        except (ConnectionError, TimeoutError) as exception:
-            logging.error("`Unknown error. Retrying.")
-            if wrapper.calls >= self.retries:
-                raise exception
-            wrapper.calls += 1
-            self._reset_connection()
-            wrapper(self, *method_args, **method_kwargs)
-        return result
-
-    wrapper.calls = 0
+        # attempts are counted per call, so concurrent and earlier failures never eat into the retry budget
+        for attempt in range(self.retries + 1):
+            try:
+                return method(self, *method_args, **method_kwargs)
+            except (ConnectionError, TimeoutError):
+                if attempt >= self.retries:
+                    raise
+                logging.error(f"`Unknown error. Retrying {attempt + 1}/{self.retries}.")
+
     return wrapper
 
 
 class KeyValueStorage:
-    def __init__(self, host: str, port: int, retries: int, timeout: int):
+    def __init__(self, host: str, port: int, retries: int, timeout: int, max_connections: int = MAX_CONNECTIONS,
+                 pool_timeout: float = POOL_TIMEOUT, health_check_interval: int = HEALTH_CHECK_INTERVAL,
+                 prewarm_connections: int = PREWARM_CONNECTIONS):
         self.host = host
         self.port = port
         self.timeout = timeout
         self.retries = retries
-        self._kv_storage = None
-        self._connect()
+        # one blocking pool shared by all server threads: a thread waits up to pool_timeout for a free
+        # connection instead of opening a new one, a failed connection is dropped by redis-py and replaced
+        # on the next checkout, idle connections are pinged before reuse after health_check_interval
+        self._pool = BlockingConnectionPool(host=host,
+                                            port=port,
+                                            socket_timeout=timeout,
+                                            socket_connect_timeout=timeout,
+                                            max_connections=max_connections,
+                                            timeout=pool_timeout,
+                                            health_check_interval=health_check_interval)
+        self._kv_storage = Redis(connection_pool=self._pool)
+        self._prewarm(min(prewarm_connections, max_connections))
 
-    def _connect(self) -> NoReturn:
+    def _prewarm(self, count: int) -> NoReturn:
+        connections = []
         try:
-            self._kv_storage = Redis(host=self.host, port=self.port, socket_timeout=self.timeout)
-            self._kv_storage.ping()
+            for _ in range(count):
+                try:
+                    connections.append(self._pool.get_connection())
+                except TypeError:
+                    # redis < 5.3 requires a command name
+                    connections.append(self._pool.get_connection("PING"))
         except Exception as error:
             logging.error(f"Error redis {self.host}:{self.port} connecting. Error: {error}")
+        finally:
+            for connection in connections:
+                self._pool.release(connection)
 
-    def _reset_connection(self) -> NoReturn:
-        self._kv_storage.close()
-        self._connect()
+    def close(self) -> NoReturn:
+        self._pool.disconnect()
 
     @make_retries
     def get(self, key: str) -> str:
         result = self._kv_storage.get(key)
         return result.decode() if result is not None else result
 
+    @make_retries
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """Fetches all keys in one MGET round-trip, None for missing keys"""
+        if not keys:
+            return []
+        return [result.decode() if result is not None else result for result in self._kv_storage.mget(keys)]
+
+    @make_retries
+    def get_many_with_ttl(self, keys: List[str],
+                          ttl_keys: List[str]) -> Tuple[List[Optional[str]], List[Optional[float]]]:
+        """Fetches keys with MGET and the remaining TTL in seconds of ttl_keys with PTTL in one pipelined round-trip.
+
+        TTL is None for missing keys and keys without expiry.
+        """
+        pipeline = self._kv_storage.pipeline(transaction=False)
+        if keys:
+            pipeline.mget(keys)
+        for key in ttl_keys:
+            pipeline.pttl(key)
+        results = pipeline.execute() if keys or ttl_keys else []
+        values = results.pop(0) if keys else []
+        return ([value.decode() if value is not None else value for value in values],
+                [ttl / 1000 if ttl >= 0 else None for ttl in results])
+
+    def cache_get_with_ttl(self, key: str) -> Tuple[Optional[float], Optional[float]]:
+        """Cached value and its remaining TTL in seconds"""
+        try:
+            (result, ), (ttl, ) = self.get_many_with_ttl([key], [key])
+        except (ConnectionError, TimeoutError) as error:
+            logging.error(f"Error get value from cache. Error: {error}")
+            return None, None
+
+        return (float(result), ttl) if result is not None else (None, None)
+
     def cache_get(self, key: str) -> Optional[float]:
         result = None
         try:
@@ -69,5 +124,19 @@ class KeyValueStorage:
         except (ConnectionError, TimeoutError) as error:
             logging.error(f"Error set value to cache. Error: {error}")
 
+    @make_retries
+    def _set_many(self, mapping: Dict[str, Union[float, int]], key_expire_time_sec: int) -> None:
+        pipeline = self._kv_storage.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipeline.set(key, str(value), ex=key_expire_time_sec)
+        pipeline.execute()
+
+    def cache_set_many(self, mapping: Dict[str, Union[float, int]], expire_time: int) -> None:
+        """Sets all keys in one pipelined round-trip"""
+        try:
+            self._set_many(mapping, key_expire_time_sec=expire_time)
+        except (ConnectionError, TimeoutError) as error:
+            logging.error(f"Error set values to cache. Error: {error}")
+
     def clear(self) -> NoReturn:
         self._kv_storage.flushall()
@@ -0,0 +1,17 @@
+import time
+
+import pytest
+
+WAIT_TIMEOUT = 5
+
+
+@pytest.fixture()
+def wait_until():
+    def wait(predicate, timeout=WAIT_TIMEOUT) -> bool:
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+    return wait
@@ -3,7 +3,7 @@ import random
 import pytest
 from redis.exceptions import ConnectionError
 
-from oop_api_tests_04.store import KeyValueStorage
+from oop_api_tests_04.store import PREWARM_CONNECTIONS as TEST_POOL_PREWARM, KeyValueStorage
 
 TEST_RETRIES = 3
 TEST_TIMEOUT = 3
@@ -40,14 +40,41 @@ def test_get_non_wrong_key_from_storage(working_store):
     assert working_store.get("wrong_key") is None
 
 
+def test_get_many_keys_from_storage(working_store):
+    working_store.cache_set("first_key", 1, expire_time=60 * 60)
+    working_store.cache_set("second_key", 2, expire_time=60 * 60)
+    assert working_store.get_many(["first_key", "wrong_key", "second_key"]) == ["1", None, "2"]
+
+
 def test_get_key_from_closed_cache(not_working_store):
     test_key = "test_key_for_not_working_cache"
     not_working_store.cache_set(test_key, 404, expire_time=60 * 60)
 
+    attempts = []
+    client_get = not_working_store._kv_storage.get
+    not_working_store._kv_storage.get = lambda key: attempts.append(key) or client_get(key)
     assert not_working_store.cache_get(test_key) is None
-    assert not_working_store.get.calls == not_working_store.retries
+    assert len(attempts) == not_working_store.retries + 1
 
 
 def test_get_key_from_closed_storage(not_working_store):
     with pytest.raises(ConnectionError):
         assert not_working_store.get("non_existent_key")
+
+
+def test_storage_reuses_pooled_connections(working_store):
+    for _ in range(20):
+        working_store.get("wrong_key")
+    assert len(working_store._pool._connections) <= TEST_POOL_PREWARM
+
+
+def test_set_many_keys_to_cache(working_store):
+    working_store.cache_set_many({"first_key": 1.5, "second_key": 3}, expire_time=60 * 60)
+    assert working_store.get_many(["first_key", "second_key"]) == ["1.5", "3"]
+
+
+def test_get_many_keys_with_ttl(working_store):
+    working_store.cache_set("first_key", 1, expire_time=60)
+    values, ttls = working_store.get_many_with_ttl(["first_key", "wrong_key"], ["first_key", "wrong_key"])
+    assert values == ["1", None]
+    assert 0 < ttls[0] <= 60 and ttls[1] is None
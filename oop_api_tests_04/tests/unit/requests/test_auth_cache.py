@@ -0,0 +1,71 @@
+import hashlib
+
+import pytest
+
+from oop_api_03 import api
+from oop_api_tests_04.tests.utils import set_valid_auth
+
+
+class CountingSha512:
+    def __init__(self):
+        self.calls = 0
+        self.sha512 = hashlib.sha512
+
+    def __call__(self, data):
+        self.calls += 1
+        return self.sha512(data)
+
+
+@pytest.fixture()
+def sha512(monkeypatch, request):
+    counter = CountingSha512()
+    monkeypatch.setattr(api.hashlib, "sha512", counter)
+    api.auth_cache.clear()
+    request.addfinalizer(api.auth_cache.clear)
+    return counter
+
+
+def method_request(login="h&f", token=None):
+    body = {"account": "horns&hoofs", "login": login, "method": "online_score", "arguments": {}}
+    if token is None:
+        set_valid_auth(body)
+    else:
+        body["token"] = token
+    request = api.MethodRequest(request_body=body)
+    request.is_valid()
+    return request
+
+
+@pytest.mark.parametrize("login", ["h&f", api.ADMIN_LOGIN])
+def test_verified_token_is_not_hashed_again(sha512, login):
+    first, second = method_request(login=login), method_request(login=login)
+    sha512.calls = 0
+    assert api.check_auth(first)
+    assert api.check_auth(second)
+    assert sha512.calls == 1
+
+
+def test_invalid_token_is_not_cached(sha512):
+    assert not api.check_auth(method_request(token="bad"))
+    assert not api.check_auth(method_request(token="bad"))
+    assert sha512.calls == 2
+
+
+def test_non_ascii_token_is_rejected(sha512):
+    assert not api.check_auth(method_request(token="токен"))
+
+
+def test_admin_entry_expires_with_hour(sha512):
+    request = method_request(login=api.ADMIN_LOGIN)
+    sha512.calls = 0
+    api.auth_cache.add((request.account, request.login, request.token), "2000010100")
+    assert api.check_auth(request)
+    assert sha512.calls == 1
+
+
+def test_cache_is_bounded():
+    cache = api.AuthCache(max_size=2)
+    for key in ("a", "b", "c"):
+        cache.add((key,), "")
+    assert not cache.check(("a",), "")
+    assert cache.check(("c",), "")
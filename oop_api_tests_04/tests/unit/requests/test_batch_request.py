@@ -0,0 +1,103 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from oop_api_03 import api
+from oop_api_tests_04.scoring import score_cache, score_key
+from oop_api_tests_04.tests.utils import KeyValueTestStorage, set_valid_auth
+
+
+class CountingStorage(KeyValueTestStorage):
+    def __init__(self):
+        super().__init__()
+        self.get_many_calls = 0
+
+    def get_many_with_ttl(self, keys, ttl_keys):
+        self.get_many_calls += 1
+        return super().get_many_with_ttl(keys, ttl_keys)
+
+
+class BrokenStorage(KeyValueTestStorage):
+    def get_many_with_ttl(self, keys, ttl_keys):
+        raise ConnectionError("store is down")
+
+
+@pytest.fixture()
+def batch_store(request):
+    store = CountingStorage()
+    store.set("i:1", ["cars", "pets"])
+    store.set("i:2", ["books"])
+    score_cache.clear()
+    request.addfinalizer(score_cache.clear)
+    return store
+
+
+def run_batch(items, store, login="h&f"):
+    request = {"account": "horns&hoofs", "login": login, "method": "batch", "arguments": {"requests": items}}
+    set_valid_auth(request)
+    context = dict()
+    response, code = api.method_handler(request={"body": request, "headers": dict()}, ctx=context, store=store)
+    return response, code, context
+
+
+def test_batch_returns_per_item_results_and_errors(batch_store):
+    response, code, context = run_batch([
+        {"method": "online_score", "arguments": {"phone": "79175002040", "email": "stupnikov@otus.ru"}},
+        {"method": "clients_interests", "arguments": {"client_ids": [1, 2, 3]}},
+        {"method": "online_score", "arguments": {"phone": "79175002040"}},
+        {"method": "unknown", "arguments": {}},
+        {"arguments": {}},
+    ], batch_store)
+
+    assert code == HTTPStatus.OK
+    assert response[0] == {"response": {"score": 3.0}, "code": HTTPStatus.OK}
+    assert response[1] == {"response": {1: ["cars", "pets"], 2: ["books"], 3: []}, "code": HTTPStatus.OK}
+    assert [item["code"] for item in response[2:]] == [HTTPStatus.UNPROCESSABLE_ENTITY] * 3
+    assert context["nrequests"] == 5
+    assert batch_store.get_many_calls == 1
+
+
+def test_batch_reuses_stored_scores(batch_store):
+    items = [{"method": "online_score", "arguments": {"first_name": "a", "last_name": "b"}}]
+    run_batch(items, batch_store)
+    score_cache.clear()
+    batch_store.cache_set_many = None
+    response, code, _ = run_batch(items, batch_store)
+    assert response == [{"response": {"score": 0.5}, "code": HTTPStatus.OK}]
+
+
+def test_batch_scores_survive_store_failure():
+    response, code, _ = run_batch([
+        {"method": "online_score", "arguments": {"phone": "79175002040", "email": "stupnikov@otus.ru"}},
+        {"method": "clients_interests", "arguments": {"client_ids": [1]}},
+    ], BrokenStorage())
+    assert response[0] == {"response": {"score": 3.0}, "code": HTTPStatus.OK}
+    assert response[1]["code"] == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def test_admin_batch_scores(batch_store):
+    response, code, _ = run_batch([{"method": "online_score", "arguments": {"phone": "79175002040",
+                                                                           "email": "stupnikov@otus.ru"}}],
+                                  batch_store, login=api.ADMIN_LOGIN)
+    assert response == [{"response": {"score": 42}, "code": HTTPStatus.OK}]
+
+
+@pytest.mark.parametrize("arguments", [{}, {"requests": []}, {"requests": {"a": 1}}, {"requests": [1]},
+                                       {"requests": [{}] * (api.MAX_BATCH_SIZE + 1)}],
+                         ids=["no_requests", "empty_requests", "requests_as_dict", "item_not_dict", "too_many"])
+def test_invalid_batch(batch_store, arguments):
+    request = {"account": "horns&hoofs", "login": "h&f", "method": "batch", "arguments": arguments}
+    set_valid_auth(request)
+    response, code = api.method_handler(request={"body": request, "headers": dict()}, ctx=dict(), store=batch_store)
+    assert code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_batch_scores_from_store_keep_their_remaining_ttl(batch_store):
+    arguments = {"first_name": "a", "last_name": "b"}
+    key = score_key(**arguments, phone=None)
+    batch_store.cache_set(key, 2.0, expire_time=60)
+    response, code, _ = run_batch([{"method": "online_score", "arguments": arguments}], batch_store)
+    assert response == [{"response": {"score": 2.0}, "code": HTTPStatus.OK}]
+    assert score_cache._entries[key][1] - time.monotonic() <= 60
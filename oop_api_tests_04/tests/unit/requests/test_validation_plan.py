@@ -0,0 +1,26 @@
+from oop_api_03.api import EmailField, OnlineScoreRequest
+
+
+def test_plan_covers_declared_fields():
+    assert [field_name for field_name, *_ in OnlineScoreRequest.validation_plan] == \
+           [field_name for field_name, _ in OnlineScoreRequest.fields]
+
+
+def test_validators_follow_mro_order():
+    field = EmailField(required=False, nullable=True)
+    assert [validator.__func__.__qualname__ for validator in field.validators] == \
+           ["BaseField._check", "CharField._check", "EmailField._check"]
+
+
+def test_invalid_fields_are_not_stored():
+    request = OnlineScoreRequest(request_body={"first_name": 42, "last_name": "Ступников"})
+    assert set(request._validate_field()) == {"first_name"}
+    assert request.last_name == "Ступников"
+    assert not hasattr(request, "first_name")
+
+
+def test_requests_store_values_in_slots():
+    request = OnlineScoreRequest(request_body={"first_name": "Стансилав"})
+    request.is_valid()
+    assert not hasattr(request, "__dict__")
+    assert request.first_name == "Стансилав"
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from oop_api_tests_04.scoring import get_interests_many
+from oop_api_tests_04.tests.utils import KeyValueTestStorage
+
+
+@pytest.fixture()
+def interests_store(request):
+    store = KeyValueTestStorage()
+    store.set("i:1", ["cars", "pets"])
+    store.set("i:2", ["books", "tv"])
+    request.addfinalizer(store.clear)
+    return store
+
+
+def test_interests_for_all_ids(interests_store):
+    assert get_interests_many(interests_store, [1, 2]) == {1: ["cars", "pets"], 2: ["books", "tv"]}
+
+
+def test_missing_id_has_no_interests(interests_store):
+    assert get_interests_many(interests_store, [2, 404]) == {2: ["books", "tv"], 404: []}
+
+
+def test_no_ids(interests_store):
+    assert get_interests_many(interests_store, []) == {}
+
+
+@pytest.mark.parametrize("stored", ['["cars"], ["pets"]', "1,2"])
+def test_value_that_is_not_one_json_document_is_an_error(interests_store, stored):
+    # decoded together, the extra element would shift client 2 onto client 1's second interest list
+    interests_store._kv_store["i:1"] = stored
+    with pytest.raises(json.JSONDecodeError):
+        get_interests_many(interests_store, [1, 2])
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from oop_api_tests_04.cache import LocalCache
+from oop_api_tests_04.scoring import get_score, score_cache, score_key
+from oop_api_tests_04.tests.utils import KeyValueTestStorage
+
+
+class CountingStorage(KeyValueTestStorage):
+    def __init__(self):
+        super().__init__()
+        self.cache_get_calls = 0
+
+    def cache_get_with_ttl(self, key):
+        self.cache_get_calls += 1
+        return super().cache_get_with_ttl(key)
+
+
+@pytest.fixture()
+def score_store(request):
+    store = CountingStorage()
+    score_cache.clear()
+    request.addfinalizer(score_cache.clear)
+    request.addfinalizer(store.clear)
+    return store
+
+
+def test_repeated_score_is_served_locally(score_store):
+    first = get_score(score_store, phone="79175002040", email="stupnikov@otus.ru")
+    second = get_score(score_store, phone="79175002040", email="stupnikov@otus.ru")
+    assert first == second == 3.0
+    assert score_store.cache_get_calls == 1
+    assert score_cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_score_is_served_locally_when_store_is_down(score_store):
+    get_score(score_store, phone="79175002040", email="stupnikov@otus.ru")
+    score_store.cache_get_with_ttl = None
+    assert get_score(score_store, phone="79175002040", email="stupnikov@otus.ru") == 3.0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LocalCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_expired_entry_is_a_miss():
+    cache = LocalCache(ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "hits": 0, "misses": 1}
+
+
+def test_score_from_store_keeps_its_remaining_ttl(score_store):
+    key = score_key(phone="79175002040", first_name="a", last_name="b")
+    score_store.cache_set(key, 2.0, expire_time=60)
+    assert get_score(score_store, phone="79175002040", email=None, first_name="a", last_name="b") == 2.0
+    assert score_cache._entries[key][1] - time.monotonic() <= 60
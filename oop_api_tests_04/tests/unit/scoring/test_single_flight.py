@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from oop_api_tests_04.cache import SingleFlight
+from oop_api_tests_04.scoring import get_score, score_cache, score_flight
+from oop_api_tests_04.tests.utils import KeyValueTestStorage
+
+CONCURRENT_CALLERS = 8
+WAIT_TIMEOUT = 5
+
+
+class SlowStorage(KeyValueTestStorage):
+    def __init__(self):
+        super().__init__()
+        self.cache_get_calls = 0
+        self.release = threading.Event()
+
+    def cache_get_with_ttl(self, key):
+        self.cache_get_calls += 1
+        self.release.wait(timeout=5)
+        return super().cache_get_with_ttl(key)
+
+
+def run_concurrently(target, count):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+@pytest.fixture()
+def slow_store(request):
+    store = SlowStorage()
+    score_cache.clear()
+    request.addfinalizer(score_cache.clear)
+    return store
+
+
+def test_concurrent_score_lookups_share_one_store_call(slow_store, wait_until):
+    coalesced = score_flight.coalesced
+    threads, results = run_concurrently(lambda: get_score(slow_store, phone="79175002040", email="a@b.ru"),
+                                        CONCURRENT_CALLERS)
+    all_coalesced = wait_until(lambda: score_flight.coalesced - coalesced >= CONCURRENT_CALLERS - 1)
+    slow_store.release.set()
+    for thread in threads:
+        thread.join(timeout=WAIT_TIMEOUT)
+
+    assert all_coalesced
+    assert results == [3.0] * CONCURRENT_CALLERS
+    assert slow_store.cache_get_calls == 1
+
+
+def test_waiters_get_leader_error(wait_until):
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(timeout=5)
+        raise ConnectionError("store is down")
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except ConnectionError as error:
+            errors.append(error)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(timeout=5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    follower_coalesced = wait_until(lambda: flight.coalesced)
+    release.set()
+    leader.join(timeout=WAIT_TIMEOUT)
+    follower.join(timeout=WAIT_TIMEOUT)
+
+    assert follower_coalesced
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_calls_after_completion_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.coalesced == 0
@@ -0,0 +1,67 @@
+import json
+import threading
+import urllib.request
+from http import HTTPStatus
+
+import pytest
+
+from oop_api_03 import api
+from oop_api_tests_04.tests.utils import KeyValueTestStorage, set_valid_auth
+
+
+@pytest.fixture(params=list(api.SERIALIZERS))
+def serializer(request):
+    try:
+        return api.SERIALIZERS[request.param]()
+    except ImportError:
+        pytest.skip(f"{request.param} is not installed")
+
+
+@pytest.fixture()
+def api_server(request, serializer, monkeypatch):
+    store = KeyValueTestStorage()
+    store.set("i:1", ["cars", "pets"])
+    monkeypatch.setattr(api.HTTPHandler, "store", store)
+    monkeypatch.setattr(api.HTTPHandler, "serializer", serializer)
+    monkeypatch.setattr(api.HTTPHandler, "log_message", lambda *args: None)
+    server = api.PooledHTTPServer(("localhost", 0), api.HTTPHandler, max_workers=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop_server():
+        server.shutdown()
+        server.server_close()
+
+    request.addfinalizer(stop_server)
+    return server
+
+
+def post(server, body):
+    request = urllib.request.Request(f"http://localhost:{server.server_port}/method",
+                                     data=json.dumps(body).encode("utf-8"), method="POST")
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.headers["Content-Length"], response.read()
+
+
+def test_response_is_written_as_json_bytes(api_server):
+    body = {"account": "horns&hoofs", "login": "h&f", "method": "clients_interests",
+            "arguments": {"client_ids": [1, 2]}}
+    set_valid_auth(body)
+    content_length, data = post(api_server, body)
+    assert int(content_length) == len(data)
+    assert json.loads(data) == {"response": {"1": ["cars", "pets"], "2": []}, "code": HTTPStatus.OK}
+
+
+def test_serializer_round_trip(serializer):
+    value = {"response": {"score": 3.0, "name": "Ступников"}, "code": HTTPStatus.OK}
+    data = serializer.dumps(value)
+    assert isinstance(data, bytes)
+    assert serializer.loads(data) == value
+
+
+def test_missing_library_falls_back_to_stdlib(monkeypatch):
+    def not_installed():
+        raise ImportError
+
+    monkeypatch.setitem(api.SERIALIZERS, "orjson", not_installed)
+    monkeypatch.setitem(api.SERIALIZERS, "ujson", not_installed)
+    assert api.load_serializer().name == "json"
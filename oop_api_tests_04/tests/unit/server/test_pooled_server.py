@@ -0,0 +1,57 @@
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from oop_api_03.api import PooledHTTPServer
+
+SLOW_HANDLER_DELAY = 0.3
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(SLOW_HANDLER_DELAY)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def pooled_server(request):
+    server = PooledHTTPServer(("localhost", 0), SlowHandler, max_workers=4, max_pending=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop_server():
+        server.shutdown()
+        server.server_close()
+
+    request.addfinalizer(stop_server)
+    return server
+
+
+def get(server):
+    with urllib.request.urlopen(f"http://localhost:{server.server_port}/", timeout=10) as response:
+        return response.status, response.read()
+
+
+def test_slow_requests_are_handled_concurrently(pooled_server):
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as clients:
+        results = list(clients.map(lambda _: get(pooled_server), range(4)))
+
+    assert results == [(200, b"ok")] * 4
+    assert time.monotonic() - started < 2 * SLOW_HANDLER_DELAY
+
+
+def test_requests_over_pool_size_are_queued_not_dropped(pooled_server):
+    with ThreadPoolExecutor(max_workers=12) as clients:
+        results = list(clients.map(lambda _: get(pooled_server), range(12)))
+
+    assert results == [(200, b"ok")] * 12
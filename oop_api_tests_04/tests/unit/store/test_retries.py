@@ -0,0 +1,41 @@
+import pytest
+from redis.exceptions import ConnectionError
+
+from oop_api_tests_04.store import KeyValueStorage
+
+TEST_RETRIES = 3
+
+
+class FlakyClient:
+    def __init__(self, failures):
+        self.failures = failures
+        self.attempts = 0
+
+    def get(self, key):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("connection reset")
+        return b"value"
+
+
+@pytest.fixture()
+def store():
+    # nothing listens on port 1, so start-up fails fast and the client is replaced below
+    store = KeyValueStorage(host="localhost", port=1, retries=TEST_RETRIES, timeout=1, prewarm_connections=0)
+    yield store
+    store.close()
+
+
+def test_transient_failures_are_retried(store):
+    store._kv_storage = FlakyClient(failures=TEST_RETRIES)
+    assert store.get("key") == "value"
+    assert store._kv_storage.attempts == TEST_RETRIES + 1
+
+
+def test_retry_budget_is_per_call(store):
+    store._kv_storage = FlakyClient(failures=TEST_RETRIES + 1)
+    with pytest.raises(ConnectionError):
+        store.get("key")
+
+    store._kv_storage = FlakyClient(failures=TEST_RETRIES)
+    assert store.get("key") == "value"
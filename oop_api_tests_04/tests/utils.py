@@ -1,7 +1,8 @@
 import datetime
 import hashlib
 import json
-from typing import Dict, List, Optional, Union
+import time
+from typing import Dict, List, Optional, Tuple, Union
 
 from oop_api_03 import api
 
@@ -9,21 +10,43 @@ from oop_api_03 import api
 class KeyValueTestStorage:
     def __init__(self):
         self._kv_store = dict()
+        self._expires = dict()
 
     def get(self, key: str) -> str:
         return self._kv_store[key]
 
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return [self._kv_store.get(key) for key in keys]
+
     def set(self, key: str, value: List[str]):
         self._kv_store[key] = json.dumps(value)
 
+    def get_many_with_ttl(self, keys: List[str],
+                          ttl_keys: List[str]) -> Tuple[List[Optional[str]], List[Optional[float]]]:
+        return self.get_many(keys), [self._ttl(key) for key in ttl_keys]
+
+    def cache_get_with_ttl(self, key: str) -> Tuple[Optional[Union[int, float]], Optional[float]]:
+        value = self.cache_get(key)
+        return (value, self._ttl(key)) if value is not None else (None, None)
+
+    def _ttl(self, key: str) -> Optional[float]:
+        expires_at = self._expires.get(key)
+        return expires_at - time.monotonic() if expires_at is not None else None
+
     def cache_get(self, key: str) -> Optional[Union[int, float]]:
         return self._kv_store.get(key)
 
     def cache_set(self, key: str, value: Union[int, float], expire_time: int) -> None:
         self._kv_store[key] = value
+        self._expires[key] = time.monotonic() + expire_time
+
+    def cache_set_many(self, mapping: Dict[str, Union[int, float]], expire_time: int) -> None:
+        for key, value in mapping.items():
+            self.cache_set(key, value, expire_time)
 
     def clear(self) -> None:
         self._kv_store.clear()
+        self._expires.clear()
 
 def set_valid_auth(request: Dict[str, Union[str, Dict, int]]):
     if request.get("login") == api.ADMIN_LOGIN: